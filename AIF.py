@@ -3,13 +3,16 @@
 
 
 import pandas as pd
-import xml.etree.ElementTree as ET
 import os
 from datetime import datetime
-import numpy as np
-import glob
 import logging
+from logging.handlers import MemoryHandler
 import lxml.etree as LT
+from itertools import repeat
+from openpyxl import load_workbook
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from pathlib import Path
 
 
 # define Python user-defined exceptions
@@ -64,691 +67,572 @@ file_handler = logging.FileHandler('OFKReport.log')  # name of error log
 file_handler.setLevel(logging.ERROR)
 # format in which error should be reported
 file_handler.setFormatter(formatter)
+# keep error records in memory and write them to the log file in batches
+memory_handler = MemoryHandler(
+    capacity=1024, flushLevel=logging.CRITICAL, target=file_handler)
+memory_handler.setLevel(logging.ERROR)
 
 stream_handler = logging.StreamHandler()  # logging error to the console
 # format in which error should be reported
 stream_handler.setFormatter(formatter)
 
-logger.addHandler(file_handler)  # adding file_handler settings to the logger
+# adding the buffered file_handler settings to the logger
+logger.addHandler(memory_handler)
 # adding stream_handler settings to the logger
 logger.addHandler(stream_handler)
 
 
-def aif_xml(files):
-    """Get excel files and convert to XML.
+XSI_NAMESPACE = "http://www.w3.org/2001/XMLSchema-instance"
+SCHEMA_LOCATION = "AIFMD_DATAIF_V1.2.xsd"
+
+# removes the angle brackets around the xml tags in the first column
+TAG_BRACKETS = str.maketrans('', '', '<>')
+
+COLUMNS = ('xmlTags', 'Id', 'XMLDescription', 'Input_1', 'Input_2', 'Input_3',
+           'Input_4', 'Input_5', 'Input_6', 'Input_7', 'Input_8', 'Input_9',
+           'Input_10', 'Input_11', 'Input_12')
+
+# [start, stop) row ids of the sections in the AIF report template
+SECTION_ROWS = {
+    'header': (1, 4),
+    'filing': (4, 10),
+    'obligationChange': (10, 16),
+    'aif': (16, 24),
+    'identifiers': (24, 33),
+    'shareClass': (33, 41),
+    'masterFeeder': (41, 45),
+    'primeBrokers': (45, 48),
+    'baseCurrency': (48, 54),
+    'jurisdictions': (54, 58),
+    'investmentStrategies': (58, 61),
+    'hft': (62, 64),
+    'navGeographicalFocus': (78, 86),
+    'aumGeographicalFocus': (86, 94),
+    'typicalPositionSize': (113, 114),
+    'investorConcentration': (118, 121),
+}
+
+PRIME_BROKER_FIELDS = ('EntityName', 'EntityIdentificationBIC', 'EntityIdentificationLEI')
+
+# container element (None to write the fields directly) and whether every
+# field is required, for the sections that are written field by field
+SECTION_ELEMENTS = {
+    'filing': (None, True),
+    'aif': (None, True),
+    'jurisdictions': (None, False),
+    'hft': (None, False),
+    'navGeographicalFocus': ('NAVGeographicalFocus', True),
+    'investorConcentration': ('InvestorConcentration', True),
+}
+
+SECTION_OF_ID = {str(i): name for name, (start, stop) in SECTION_ROWS.items()
+                 for i in range(start, stop)}
+
+# xml tags of the ranked sections in the AIF report template
+MAIN_INSTRUMENT_TAGS = frozenset('m' + str(i) for i in range(1, 6))
+PRINCIPAL_EXPOSURE_TAGS = frozenset('p' + str(i) for i in range(1, 11))
+PORTFOLIO_CONCENTRATION_TAGS = frozenset('q' + str(i) for i in range(1, 6))
+PRINCIPAL_MARKET_TAGS = frozenset('r' + str(i) for i in range(1, 4))
+
+
+@contextmanager
+def _xml_writer(path):
+    """Open an incremental xml writer on path.
+
+    The file is removed again if writing fails halfway, so no truncated
+    report is left behind for validation.
+    """
+    try:
+        # a 1 MiB buffer turns the many small writes into few large ones
+        with open(path, 'wb', buffering=1 << 20) as output, \
+                LT.xmlfile(output, encoding='UTF-8') as xf:
+            xf.write_declaration()
+            yield xf
+    except Exception:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
 
-    Parameters
-    ----------
-    files : str
-        The file location of the spreadsheet.
 
-    output : str
-        Output name of the file.
+def _write(xf, tag, text, Element=LT.Element):
+    """Write a single element with the given text to the xml writer.
+
+    Element is bound as a default so the lookup is local on every call.
+    """
+    element = Element(tag)
+    element.text = text
+    xf.write(element)
+
 
+def _add(xf, tag, value, required=False, upper=False, lower=False):
+    """Write value as element tag, empty values are skipped.
 
     Raises
     -------
     EmptyValueError
-        if no input value is provided
+        If value is empty and the field is required.
+    """
+    if value == "":
+        if required:
+            raise EmptyValueError(f"{tag} field cannot be empty!")
+        return
 
-    DomainValueError
-        if input value is does not corresponds with the domain values required
+    if isinstance(value, datetime):
+        value = value.date()
+    text = str(value)
+    if upper:
+        text = text.upper()
+    elif lower:
+        text = text.lower()
+    _write(xf, tag, text)
 
-    LengthValueRequiredError
-        if value exceed the length of what is required
 
-    NoFilesFoundError
-        if no files are selected.
+def _emit_section(xf, sections, name):
+    """Write the fields of a section listed in SECTION_ELEMENTS.
 
-    UnassinedIntegerError
-        if value is not an unsigned integer (not a negative number or contain decimal).
+    The fields are wrapped in the section's container element if it has one.
+    """
+    container, required = SECTION_ELEMENTS[name]
+    with xf.element(container) if container else nullcontext():
+        for tag, value in sections[name]:
+            _add(xf, tag, value, required=required)
+
+
+def _read_rows(file):
+    """Read the first sheet of a workbook as tuples of len(COLUMNS) cells.
 
+    .xlsx files are read with openpyxl's read-only row iterator, legacy .xls
+    files still go through pandas. Empty cells are returned as "".
+    """
+    width = len(COLUMNS)
+    if file.suffix == '.xlsx':
+        # the read-only sheet is parsed lazily from the open zip while iterating,
+        # a large read buffer saves most of the small reads on bigger workbooks
+        with open(file, 'rb', buffering=1 << 20) as handle:
+            workbook = load_workbook(handle, read_only=True, data_only=True)
+            sheet = workbook.worksheets[0]
+            rows = [tuple('' if v is None else v for v in row)
+                    for row in sheet.iter_rows(max_col=width, values_only=True)]
+            workbook.close()
+    else:
+        df = pd.read_excel(file, header=None, dtype=object).fillna('')
+        rows = list(df.itertuples(index=False, name=None))
+    return [row + ('',) * (width - len(row)) for row in rows]
+
+
+def _index_rows(rows):
+    """Clean the sheet rows and index them in a single pass.
+
+    The angle brackets are removed from the xml tags and the text cells after
+    the Id column are stripped. Returns the cleaned rows, the (xmlTags, Input_1)
+    pairs of every section in SECTION_ROWS and the row positions per xml tag,
+    all in sheet order. Ranks in the Id column are ints and match no section.
+    """
+    cleaned = []
+    sections = {name: [] for name in SECTION_ROWS}
+    rowsByTag = {}
+    for position, row in enumerate(rows):
+        tag = row[0].translate(TAG_BRACKETS) if isinstance(row[0], str) else row[0]
+        row = (tag, row[1]) + tuple(v.strip() if isinstance(v, str) else v for v in row[2:])
+        cleaned.append(row)
+        if row[1] in SECTION_OF_ID:
+            sections[SECTION_OF_ID[row[1]]].append((tag, row[3]))
+        rowsByTag.setdefault(tag, []).append(position)
+    return cleaned, sections, rowsByTag
+
+
+def _tagged(rows, rowsByTag, tags, stop=None):
+    """Return the rows with the given xml tags in sheet order, starting at the Id column."""
+    positions = sorted(p for tag in tags & rowsByTag.keys() for p in rowsByTag[tag])
+    return [rows[p][1:stop] for p in positions]
+
+
+def _aif_report(file, generated_on):
+    """Convert a single AIF workbook to an xml report next to it.
+
+    Runs in a worker process of aif_xml, see there for the raised errors.
     """
     try:
-        if len(files) == 0:
-            raise NoFilesFoundError(
-                "No excel files selected. Specify path to excel document and try again!")
+        logger.debug('Generating xml for --> %s\n', file)
+        file = Path(file)
+        # index the sheet once, every section below is a plain dict lookup
+        rows, sections, rowsByTag = _index_rows(_read_rows(file))
 
-        for file in files:
-            logger.debug(f'Generating xml for --> {file}\n')
-            output = os.path.splitext(file)[0]
-            df = pd.read_excel(file, header=None)
-            df = df.replace(np.nan, '', regex=True)
-            df.columns = ['xmlTags', 'Id', 'XMLDescription', 'Input_1', 'Input_2', 'Input_3',
-                          'Input_4', 'Input_5', 'Input_6', 'Input_7', 'Input_8', 'Input_9',
-                          'Input_10', 'Input_11', 'Input_12']
-            df.xmlTags = df.xmlTags.str.strip('<>')
-
-#            print(df.head())
-
-            headerRows = [str(i) for i in range(1, 4)]
-            headerFileKeys = df[df.Id.isin(headerRows)][[
-                'xmlTags', 'Input_1']].values.tolist()
-
-            if headerFileKeys[0][1] and headerFileKeys[1][1] == "":
-                raise EmptyValueError(
-                    f"{headerFileKeys[0][0]} and {headerFileKeys[1][0]} fields cannot be empty!")
-
-            generated_on = datetime.today().strftime('%Y-%m-%dT%H:%M:%S.0Z')
-            root = ET.Element('AIFReportingInfo')
-            root.set("xsi:noNamespaceSchemaLocation", "AIFMD_DATAIF_V1.2.xsd")
-            root.set('CreationDateAndTime', generated_on)
-            root.set(headerFileKeys[0][0], str(headerFileKeys[0][1]).strip())
-            root.set(headerFileKeys[1][0], str(headerFileKeys[1][1]).strip())
-            root.set("xmlns:xsi", "http://www.w3.org/2001/XMLSchema-instance")
-
-            sectionRows = [str(i) for i in range(4, 10)]
-            headerSectionKeys = df[df.Id.isin(
-                sectionRows)][['xmlTags', 'Input_1']].values.tolist()
-            headerSectionKeys = {i[0]: i[1] for i in headerSectionKeys}
-
-            AIFRecordInfo = ET.SubElement(root, 'AIFRecordInfo')
-            for k, v in headerSectionKeys.items():
-                if v != "":
-                    if k not in ['ReportingPeriodStartDate', 'ReportingPeriodEndDate']:
-                        k = ET.SubElement(AIFRecordInfo, k)
-                        k.text = str(v).strip()
-                    else:
-                        k = ET.SubElement(AIFRecordInfo, k)
-                        k.text = str(v.date()).strip()
-                else:
-                    raise EmptyValueError(f"{k} field cannot be empty!")
+        headerFileKeys = sections['header']
 
-            sectionRows = [str(i) for i in range(10, 16)]
-            headerSectionKeys = df[df.Id.isin(
-                sectionRows)][['xmlTags', 'Input_1']].values.tolist()
-            headerSectionKeys = {i[0]: i[1] for i in headerSectionKeys}
-#            print(headerSectionKeys)
-#
-            if headerSectionKeys['AIFReportingObligationChangeFrequencyCode'] != "":
-                AIFReportingObligationChangeFrequencyCode = ET.SubElement(
-                    AIFRecordInfo, 'AIFReportingObligationChangeFrequencyCode')
-                AIFReportingObligationChangeFrequencyCode.text = str(
-                    headerSectionKeys['AIFReportingObligationChangeFrequencyCode']).strip()
-
-            if headerSectionKeys['AIFReportingObligationChangeContentsCode'] != "":
-                AIFReportingObligationChangeContentsCode = ET.SubElement(
-                    AIFRecordInfo, 'AIFReportingObligationChangeContentsCode')
-                AIFReportingObligationChangeContentsCode.text = str(
-                    headerSectionKeys['AIFReportingObligationChangeContentsCode']).strip()
-
-            if headerSectionKeys['AIFReportingObligationChangeFrequencyCode'] or headerSectionKeys['AIFReportingObligationChangeContentsCode'] != "":
-                if headerSectionKeys['AIFReportingObligationChangeQuarter'] != "":
-                    AIFReportingObligationChangeQuarter = ET.SubElement(
-                        AIFRecordInfo, 'AIFReportingObligationChangeQuarter')
-                    AIFReportingObligationChangeQuarter.text = str(
-                        headerSectionKeys['AIFReportingObligationChangeQuarter']).strip()
-                else:
-                    raise EmptyValueError(
-                        "AIFReportingObligationChangeQuarter field cannot be empty!")
-
-            if headerSectionKeys['LastReportingFlag'] != "":
-                LastReportingFlag = ET.SubElement(
-                    AIFRecordInfo, 'LastReportingFlag')
-                LastReportingFlag.text = str(
-                    headerSectionKeys['LastReportingFlag']).lower().strip()
-            else:
-                raise EmptyValueError(
-                    "LastReportingFlag field cannot be empty!")
+        if headerFileKeys[0][1] and headerFileKeys[1][1] == "":
+            raise EmptyValueError(
+                f"{headerFileKeys[0][0]} and {headerFileKeys[1][0]} fields cannot be empty!")
+
+        rootAttributes = {'{%s}noNamespaceSchemaLocation' % XSI_NAMESPACE: SCHEMA_LOCATION,
+                          'CreationDateAndTime': generated_on,
+                          headerFileKeys[0][0]: str(headerFileKeys[0][1]),
+                          headerFileKeys[1][0]: str(headerFileKeys[1][1])}
+
+        # elements are streamed to disk as soon as they are complete
+        with _xml_writer(file.with_suffix('.xml')) as xf, \
+                xf.element('AIFReportingInfo', rootAttributes, nsmap={'xsi': XSI_NAMESPACE}), \
+                xf.element('AIFRecordInfo'):
+
+            _emit_section(xf, sections, 'filing')
+
+            headerSectionKeys = dict(sections['obligationChange'])
+
+            changeCodes = ('AIFReportingObligationChangeFrequencyCode',
+                           'AIFReportingObligationChangeContentsCode')
+            for tag in changeCodes:
+                _add(xf, tag, headerSectionKeys[tag])
+
+            # a change of either code needs the quarter in which it applies
+            if any(headerSectionKeys[tag] != "" for tag in changeCodes):
+                _add(xf, 'AIFReportingObligationChangeQuarter',
+                     headerSectionKeys['AIFReportingObligationChangeQuarter'], required=True)
+
+            _add(xf, 'LastReportingFlag', headerSectionKeys['LastReportingFlag'],
+                 required=True, lower=True)
 
             if headerSectionKeys['QuestionNumber'] and headerSectionKeys['AssumptionDescription'] == "":
                 if len(headerSectionKeys['AssumptionDescription']) > 300:
                     raise LengthValueRequiredError(
                         f'AssumptionDescription string required in this field should not be greater 300!')
 
-                QuestionNumber = ET.SubElement(AIFRecordInfo, 'QuestionNumber')
-                QuestionNumber.text = str(
-                    headerSectionKeys['QuestionNumber']).strip()
-                AssumptionDescription = ET.SubElement(
-                    AIFRecordInfo, 'AssumptionDescription')
-                AssumptionDescription.text = str(
-                    headerSectionKeys['AssumptionDescription']).strip()
-
-            sectionRows = [str(i) for i in range(16, 24)]
-            headerSectionKeys = df[df.Id.isin(
-                sectionRows)][['xmlTags', 'Input_1']].values.tolist()
-            headerSectionKeys = {i[0]: i[1] for i in headerSectionKeys}
-
-            for k, v in headerSectionKeys.items():
-                if v != "":
-                    k = ET.SubElement(AIFRecordInfo, k)
-                    k.text = str(v).strip()
-                else:
-                    raise EmptyValueError(f"{k} field cannot be empty!")
-
-            identifierRows = [str(i) for i in range(24, 33)]
-            AIFIdentifiers = df[df.Id.isin(identifierRows)][[
-                'xmlTags', 'Input_1']].values.tolist()
-            AIFIdentifiers = {i[0]: i[1].strip() for i in AIFIdentifiers}
-
-            AIFCompleteDescription = ET.SubElement(
-                AIFRecordInfo, 'AIFCompleteDescription')
-            AIFPrincipalInfo = ET.SubElement(
-                AIFCompleteDescription, 'AIFPrincipalInfo')
-
-            if AIFIdentifiers:
-                if (AIFIdentifiers['ReportingMemberState'] != "" and AIFIdentifiers['AIFNationalCode'] == "") or (AIFIdentifiers['AIFNationalCode'] != "" and AIFIdentifiers['ReportingMemberState'] == ""):
-                    raise ConditionalError(
-                        " Value required for ReportingMemberState if AIFNationalCode is filled and vice versa")
-
-                counter = 0
-                for k, v in AIFIdentifiers.items():
-                    if v != "" and counter == 0:
-                        AIFIdentification = ET.SubElement(
-                            AIFPrincipalInfo, 'AIFIdentification')
-                        k = ET.SubElement(AIFIdentification, k)
-                        k.text = str(v).strip()
-                    elif v != "" and counter != 0:
-                        k = ET.SubElement(AIFIdentification, k)
-                        k.text = str(v).strip()
-                    counter += 1
-
-            shareClassRows = [str(i) for i in range(33, 41)]
-            shareClass = df[df.Id.isin(shareClassRows)][[
-                'xmlTags', 'Input_1']].values.tolist()
-            shareClass = {i[0]: i[1] for i in shareClass}
-
-            ShareClassFlag = ET.SubElement(AIFPrincipalInfo, 'ShareClassFlag')
-#
-            if str(shareClass['ShareClassFlag']).lower().strip() == 'false':
-                ShareClassFlag.text = str(shareClass['ShareClassFlag']).strip()
-            else:
-                if shareClass['ShareClassName'] == "" and str(shareClass['ShareClassFlag']).lower().strip() == 'true':
-                    raise EmptyValueError("Share class name field is required")
-
-                ShareClassIdentification = ET.SubElement(
-                    AIFPrincipalInfo, 'ShareClassIdentification')
-                for k, v in shareClass.items():
-                    ShareClassIdentifier = ET.SubElement(
-                        ShareClassIdentification, 'ShareClassIdentifier')
-                    if v != "":
-                        k = ET.SubElement(ShareClassIdentifier, k)
-                        k.text = str(v).strip()
+                _write(xf, 'QuestionNumber', str(
+                    headerSectionKeys['QuestionNumber']))
+                _write(xf, 'AssumptionDescription', str(
+                    headerSectionKeys['AssumptionDescription']))
+
+            _emit_section(xf, sections, 'aif')
+
+            AIFIdentifiers = dict(sections['identifiers'])
+
+            with xf.element('AIFCompleteDescription'), xf.element('AIFPrincipalInfo'):
+
+                if AIFIdentifiers:
+                    if (AIFIdentifiers['ReportingMemberState'] != "" and AIFIdentifiers['AIFNationalCode'] == "") or (AIFIdentifiers['AIFNationalCode'] != "" and AIFIdentifiers['ReportingMemberState'] == ""):
+                        raise ConditionalError(
+                            " Value required for ReportingMemberState if AIFNationalCode is filled and vice versa")
+
+                    identifiers = [(k, v) for k, v in AIFIdentifiers.items() if v != ""]
+                    if identifiers:
+                        with xf.element('AIFIdentification'):
+                            for k, v in identifiers:
+                                _write(xf, k, str(v))
+
+                shareClass = dict(sections['shareClass'])
 #
-            masterFeederRows = [str(i) for i in range(41, 45)]
-            masterFeeder = df[df.Id.isin(masterFeederRows)][[
-                'xmlTags', 'Input_1']].values.tolist()
-            masterFeeder = {i[0]: i[1] for i in masterFeeder}
-
-            AIFDescription = ET.SubElement(AIFPrincipalInfo, 'AIFDescription')
-            AIFMasterFeederStatus = ET.SubElement(
-                AIFDescription, 'AIFMasterFeederStatus')
-            AIFMasterFeederStatus.text = str(
-                masterFeeder['AIFMasterFeederStatus']).upper().strip()
-
-            if (masterFeeder['AIFMasterFeederStatus']).upper().strip() == "FEEDER":
-                if masterFeeder['AIFName'] == "":
-                    raise EmptyValueError('Value required for AIFName field')
-
-                MasterAIFsIdentification = ET.SubElement(
-                    AIFDescription, 'MasterAIFsIdentification')
-                MasterAIFIdentification = ET.SubElement(
-                    MasterAIFsIdentification, 'MasterAIFIdentification')
-
-                AIFName = ET.SubElement(MasterAIFIdentification, 'AIFName')
-                AIFName.text = str(masterFeeder['AIFName']).strip()
-
-                if masterFeeder['ReportingMemberState'] != "" and masterFeeder['AIFNationalCode'] == "":
-                    raise EmptyValueError(
-                        "Value is required for AIFNationalCode field")
-
-                AIFIdentifierNCA = ET.SubElement(
-                    MasterAIFIdentification, 'AIFIdentifierNCA')
-
-                if masterFeeder['ReportingMemberState'] != "":
-                    ReportingMemberState = ET.SubElement(
-                        AIFIdentifierNCA, 'ReportingMemberState')
-                    ReportingMemberState.text = str(
-                        masterFeeder['ReportingMemberState']).strip()
-                if masterFeeder['AIFNationalCode'] != "":
-                    AIFNationalCode = ET.SubElement(
-                        AIFIdentifierNCA, 'AIFNationalCode')
-                    AIFNationalCode.text = str(
-                        masterFeeder['AIFNationalCode']).strip()
-
-            primeBrokersRows = [str(i) for i in range(45, 48)]
-            primeBrokers = df[df.Id.isin(primeBrokersRows)][[
-                'xmlTags', 'Input_1']].values.tolist()
-            primeBrokers = {i[0]: i[1] for i in primeBrokers}
-
-            counter = 0
-
-            if primeBrokers:
-                for k, v in AIFIdentifiers.items():
-                    if v != "" and counter == 0:
-                        PrimeBrokers = ET.SubElement(
-                            AIFDescription, 'PrimeBrokers')
-                        PrimeBrokerIdentification = ET.SubElement(
-                            PrimeBrokers, 'PrimeBrokerIdentification')
-                        k = ET.SubElement(
-                            PrimeBrokerIdentification, k)
-                        k.text = str(v).strip()
-                    elif v != "" and counter != 0:
-                        k = ET.SubElement(PrimeBrokerIdentification, k)
-                        k.text = str(v).strip()
-                    counter += 1
-
-            valuesRows = (str(i) for i in range(48, 54))
-            principalValues = df[df.Id.isin(
-                valuesRows)][['xmlTags', 'Input_1']].values.tolist()
-            principalValues = {i[0]: i[1] for i in principalValues}
-
-            if principalValues['BaseCurrency'] and principalValues['AIFNetAssetValue'] and principalValues['AUMAmountInBaseCurrency'] == "":
-                raise EmptyValueError(
-                    ' AUMAmountInBaseCurrency, BaseCurrency & AIFNetAssetValue cannot be empty')
-
-            AIFBaseCurrencyDescription = ET.SubElement(
-                AIFDescription, 'AIFBaseCurrencyDescription')
-
-            BaseCurrency = ET.SubElement(
-                AIFBaseCurrencyDescription, 'BaseCurrency')
-            BaseCurrency.text = str(
-                principalValues['BaseCurrency']).upper().strip()
-            AUMAmountInBaseCurrency = ET.SubElement(
-                AIFBaseCurrencyDescription, 'AUMAmountInBaseCurrency')
-            AUMAmountInBaseCurrency.text = str(
-                principalValues['AUMAmountInBaseCurrency']).strip()
-
-            if (principalValues['BaseCurrency']).upper().strip() != 'EUR':
-
-                if principalValues['FXEURRate'] and principalValues['FXEURReferenceRateType'] != "":
-                    FXEURReferenceRateType = ET.SubElement(
-                        AIFBaseCurrencyDescription, 'FXEURReferenceRateType')
-                    FXEURReferenceRateType.text = str(
-                        principalValues['FXEURReferenceRateType']).upper().strip()
-                    FXEURRate = ET.SubElement(
-                        AIFBaseCurrencyDescription, 'FXEURRate')
-                    FXEURRate.text = str(principalValues['FXEURRate']).strip()
+                if str(shareClass['ShareClassFlag']).lower() == 'false':
+                    _write(xf, 'ShareClassFlag', str(shareClass['ShareClassFlag']))
                 else:
-                    raise EmptyValueError(
-                        ' FXEURRate & FXEURReferenceRateType cannot be empty')
-
-            if (principalValues['FXEURReferenceRateType']).upper().strip() == "OTH":
-                if principalValues['FXEUROtherReferenceRateDescription'] != "":
-                    FXEUROtherReferenceRateDescription = ET.SubElement(
-                        AIFBaseCurrencyDescription, 'FXEUROtherReferenceRateDescription')
-                    FXEUROtherReferenceRateDescription.text = str(
-                        principalValues['FXEUROtherReferenceRateDescription']).strip()
-                else:
-                    raise EmptyValueError(
-                        'FXEUROthReferenceRateDescription cannot be empty')
+                    _write(xf, 'ShareClassFlag', None)
 
-            AIFNetAssetValue = ET.SubElement(
-                AIFDescription, 'AIFNetAssetValue')
-            AIFNetAssetValue.text = str(
-                principalValues['AIFNetAssetValue']).strip()
-#
-            jurisdictionRows = (str(i) for i in range(54, 58))
-            jurisdictionValues = df[df.Id.isin(jurisdictionRows)][[
-                'xmlTags', 'Input_1']].values.tolist()
-            jurisdictionValues = {i[0]: i[1] for i in jurisdictionValues}
-
-            if jurisdictionValues['PredominantAIFType'] == "":
-                raise EmptyValueError(
-                    "PredominantAIFType field cannot be empty")
-
-            if jurisdictionValues:
-                for k, v in jurisdictionValues.items():
-                    if v != "":
-                        k = ET.SubElement(AIFDescription, k)
-                        k.text = str(v).strip()
-#
-            investmentRows = [str(i) for i in range(58, 61)]
-            investmentValues = df[df.Id.isin(investmentRows)][[
-                'xmlTags', 'Input_1']].values.tolist()
-            investmentValues = {i[0]: i[1] for i in investmentValues}
-
-            if jurisdictionValues['PredominantAIFType'] == "HFND":
-                HedgeFundInvestmentStrategies = ET.SubElement(
-                    AIFDescription, 'HedgeFundInvestmentStrategies')
-                HedgeFundInvestmentStrategy = ET.SubElement(
-                    HedgeFundInvestmentStrategies, 'HedgeFundInvestmentStrategy')
-                for k, v in investmentValues.items():
-                    k = ET.SubElement(HedgeFundInvestmentStrategy, k)
-                    k.text = str(v).strip()
+                    if shareClass['ShareClassName'] == "" and str(shareClass['ShareClassFlag']).lower() == 'true':
+                        raise EmptyValueError("Share class name field is required")
+
+                    with xf.element('ShareClassIdentification'):
+                        for k, v in shareClass.items():
+                            with xf.element('ShareClassIdentifier'):
+                                _add(xf, k, v)
 #
-            elif jurisdictionValues['PredominantAIFType'] == "PEQF":
-                PrivateEquityFundInvestmentStrategies = ET.SubElement(
-                    AIFDescription, 'PrivateEquityFundInvestmentStrategies')
-                PrivateEquityFundInvestmentStrategy = ET.SubElement(
-                    PrivateEquityFundInvestmentStrategies, 'PrivateEquityFundInvestmentStrategy')
-                for k, v in investmentValues.items():
-                    if v != "":
-                        k = ET.SubElement(
-                            PrivateEquityFundInvestmentStrategy, k)
-                        k.text = str(v).strip()
-                    else:
+                masterFeeder = dict(sections['masterFeeder'])
+
+                with xf.element('AIFDescription'):
+                    _write(xf, 'AIFMasterFeederStatus', str(
+                        masterFeeder['AIFMasterFeederStatus']).upper())
+
+                    if (masterFeeder['AIFMasterFeederStatus']).upper() == "FEEDER":
+                        if masterFeeder['AIFName'] == "":
+                            raise EmptyValueError('Value required for AIFName field')
+
+                        with xf.element('MasterAIFsIdentification'), xf.element('MasterAIFIdentification'):
+                            _write(xf, 'AIFName', str(masterFeeder['AIFName']))
+
+                            if masterFeeder['ReportingMemberState'] != "" and masterFeeder['AIFNationalCode'] == "":
+                                raise EmptyValueError(
+                                    "Value is required for AIFNationalCode field")
+
+                            with xf.element('AIFIdentifierNCA'):
+                                _add(xf, 'ReportingMemberState',
+                                     masterFeeder['ReportingMemberState'])
+                                _add(xf, 'AIFNationalCode', masterFeeder['AIFNationalCode'])
+
+                    primeBrokers = dict(sections['primeBrokers'])
+
+                    # written in schema order, the template lists the LEI before the BIC
+                    brokerFields = [(k, primeBrokers[k]) for k in PRIME_BROKER_FIELDS
+                                    if primeBrokers.get(k, "") != ""]
+                    if brokerFields:
+                        with xf.element('PrimeBrokers'), xf.element('PrimeBrokerIdentification'):
+                            for k, v in brokerFields:
+                                _write(xf, k, str(v))
+
+                    principalValues = dict(sections['baseCurrency'])
+
+                    if principalValues['BaseCurrency'] and principalValues['AIFNetAssetValue'] and principalValues['AUMAmountInBaseCurrency'] == "":
                         raise EmptyValueError(
-                            f"{k} field cannot be empty")
-            else:
-                raise NotImplementedError(
-                    f"Script has not been implemented for this {investmentValues['PrivateEquityFundStrategyType']} yet")
-
-            hFTTransactionNumber = [str(i) for i in range(62, 64)]
-            hFTTransactionNumber = df[df.Id.isin(hFTTransactionNumber)][[
-                'xmlTags', 'Input_1']].values.tolist()
-
-            for FTTransactionNumber in hFTTransactionNumber:
-                if FTTransactionNumber[1] != '':
-                    FTTransactionNumber[0] = ET.SubElement(
-                        AIFDescription, FTTransactionNumber[0])
-                    FTTransactionNumber[0].text = str(
-                        FTTransactionNumber[1]).strip()
+                            ' AUMAmountInBaseCurrency, BaseCurrency & AIFNetAssetValue cannot be empty')
+
+                    with xf.element('AIFBaseCurrencyDescription'):
+                        _write(xf, 'BaseCurrency', str(
+                            principalValues['BaseCurrency']).upper())
+                        _write(xf, 'AUMAmountInBaseCurrency', str(
+                            principalValues['AUMAmountInBaseCurrency']))
+
+                        if (principalValues['BaseCurrency']).upper() != 'EUR':
+
+                            if principalValues['FXEURRate'] and principalValues['FXEURReferenceRateType'] != "":
+                                _write(xf, 'FXEURReferenceRateType', str(
+                                    principalValues['FXEURReferenceRateType']).upper())
+                                _write(xf, 'FXEURRate', str(principalValues['FXEURRate']))
+                            else:
+                                raise EmptyValueError(
+                                    ' FXEURRate & FXEURReferenceRateType cannot be empty')
+
+                        if (principalValues['FXEURReferenceRateType']).upper() == "OTH":
+                            _add(xf, 'FXEUROtherReferenceRateDescription',
+                                 principalValues['FXEUROtherReferenceRateDescription'], required=True)
+
+                    _write(xf, 'AIFNetAssetValue', str(
+                        principalValues['AIFNetAssetValue']))
 #
-            principalExRows = ['m' + str(i) for i in range(1, 6)]
-            principalExValues = df[df.xmlTags.isin(principalExRows)][['Id', 'XMLDescription', 'Input_1', 'Input_2', 'Input_3',
-                                                                      'Input_4', 'Input_5', 'Input_6', 'Input_7', 'Input_8', 'Input_9', 'Input_10', 'Input_11', 'Input_12']].values.tolist()
-            MainInstrumentsTraded = ET.SubElement(
-                AIFPrincipalInfo, 'MainInstrumentsTraded')
-
-            for principalExValue in principalExValues:
-                MainInstrumentTraded = ET.SubElement(
-                    MainInstrumentsTraded, 'MainInstrumentTraded')
-                Ranking = ET.SubElement(MainInstrumentTraded, 'Ranking')
-                Ranking.text = str(principalExValue[0]).strip()
-                if principalExValues[1] == "":
-                    raise EmptyValueError("SubAssetType field cannot empty")
-                SubAssetType = ET.SubElement(
-                    MainInstrumentTraded, 'SubAssetType')
-                SubAssetType.text = str(principalExValue[1]).strip()
-
-                if principalExValue[1] != 'NTA_NTA_NOTA':
-                    if principalExValue[2] == "":
-                        raise EmptyValueError(
-                            "InstrumentCodeType field cannot empty")
-                    InstrumentCodeType = ET.SubElement(
-                        MainInstrumentTraded, 'InstrumentCodeType')
-                    InstrumentCodeType.text = str(
-                        principalExValue[2]).strip()
+                    jurisdictionValues = dict(sections['jurisdictions'])
 
-                    if principalExValue[3] == "":
+                    if jurisdictionValues['PredominantAIFType'] == "":
                         raise EmptyValueError(
-                            "InstrumentName field cannot empty")
-                    InstrumentName = ET.SubElement(
-                        MainInstrumentTraded, 'InstrumentName')
-                    InstrumentName.text = str(principalExValue[3]).strip()
+                            "PredominantAIFType field cannot be empty")
 
-                if principalExValue[2] == 'ISIN':
-                    if principalExValue[4] == "":
-                        raise EmptyValueError(
-                            "ISINInstrumentIdentification field cannot empty")
-                    ISINInstrumentIdentification = ET.SubElement(
-                        MainInstrumentTraded, 'ISINInstrumentIdentification')
-                    ISINInstrumentIdentification.text = str(
-                        principalExValue[4]).strip()
-
-                if principalExValue[2] == 'AII':
-                    AIIInstrumentIdentification = AIIExchangeCode = ET.SubElement(
-                        MainInstrumentTraded, 'AIIInstrumentIdentification')
-                    print(principalExValue[9])
-                    if principalExValue[5] == "":
-                        raise EmptyValueError(
-                            "AIIExchangeCode field cannot empty")
+                    _emit_section(xf, sections, 'jurisdictions')
 #
-                    AIIExchangeCode = ET.SubElement(
-                        AIIInstrumentIdentification, 'AIIExchangeCode')
-                    AIIExchangeCode.text = str(
-                        principalExValue[5]).strip()
-                    if principalExValue[6] == "":
-                        raise EmptyValueError(
-                            "AIIDerivativeType field cannot empty")
-                    AIIDerivativeType = ET.SubElement(
-                        AIIInstrumentIdentification, 'AIIDerivativeType')
-                    AIIDerivativeType.text = str(
-                        principalExValue[6]).strip()
-                    if principalExValue[7] == "":
-                        raise EmptyValueError(
-                            "AIIPutCallIdentifier field cannot empty")
-                    AIIPutCallIdentifier = ET.SubElement(
-                        AIIInstrumentIdentification, 'AIIPutCallIdentifier')
-                    AIIPutCallIdentifier.text = str(
-                        principalExValue[7]).strip()
-                    if principalExValue[8] == "":
-                        raise EmptyValueError(
-                            "AIIExpiryDate field cannot empty")
-                    AIIExpiryDate = ET.SubElement(
-                        AIIInstrumentIdentification, 'AIIExpiryDate')
-                    AIIExpiryDate.text = str(
-                        principalExValue[8]).strip()
-                    if principalExValue[9] == "":
-                        raise EmptyValueError(
-                            "AIIStrikePrice field cannot empty")
-                    AIIStrikePrice = ET.SubElement(
-                        AIIInstrumentIdentification, 'AIIStrikePrice')
-                    AIIStrikePrice.text = str(
-                        principalExValue[9]).strip()
-
-                if principalExValue[1] != 'NTA_NTA_NOTA':
-                    PositionValue = ET.SubElement(
-                        MainInstrumentTraded, 'PositionValue')
-                    PositionValue.text = str(principalExValue[-2]).strip()
-                    PositionType = ET.SubElement(
-                        MainInstrumentTraded, 'PositionType')
-                    PositionType.text = str(
-                        principalExValue[-3]).upper().strip()
-
-                if str(principalExValue[-3]).upper().strip() == 'S':
-                    ShortPositionHedgingRate = ET.SubElement(
-                        MainInstrumentTraded, 'ShortPositionHedgingRate')
-                    ShortPositionHedgingRate.text = str(
-                        principalExValue[-1]).strip()
-
-            NAVGeographicalFocusRows = [str(i) for i in range(78, 86)]
-            navGeographicalFocus = df[df.Id.isin(NAVGeographicalFocusRows)][[
-                'xmlTags', 'Input_1']].values.tolist()
-            navGeographicalFocus = {i[0]: i[1] for i in navGeographicalFocus}
-            NAVGeographicalFocus = ET.SubElement(
-                AIFPrincipalInfo, 'NAVGeographicalFocus')
-
-            for k, v in navGeographicalFocus.items():
-                if v != "":
-                    k = ET.SubElement(NAVGeographicalFocus, k)
-                    k.text = str(v).strip()
-                else:
-                    raise EmptyValueError(f"{k} cannot be empty")
+                    investmentValues = dict(sections['investmentStrategies'])
+
+                    if jurisdictionValues['PredominantAIFType'] == "HFND":
+                        with xf.element('HedgeFundInvestmentStrategies'), xf.element('HedgeFundInvestmentStrategy'):
+                            for k, v in investmentValues.items():
+                                _write(xf, k, str(v))
 #
-            AUMGeographicalFocusRows = [str(i) for i in range(86, 94)]
-            aumGeographicalFocus = df[df.Id.isin(AUMGeographicalFocusRows)][[
-                'xmlTags', 'Input_1']].values.tolist()
-            aumGeographicalFocus = {i[0]: i[1] for i in aumGeographicalFocus}
-            if aumGeographicalFocus:
-                AUMGeographicalFocus = ET.SubElement(
-                    AIFPrincipalInfo, 'AUMGeographicalFocus')
-                for k, v in aumGeographicalFocus.items():
-                    k = ET.SubElement(AUMGeographicalFocus, k)
-                    k.text = str(v).strip()
+                    elif jurisdictionValues['PredominantAIFType'] == "PEQF":
+                        with xf.element('PrivateEquityFundInvestmentStrategies'), xf.element('PrivateEquityFundInvestmentStrategy'):
+                            for k, v in investmentValues.items():
+                                _add(xf, k, v, required=True)
+                    else:
+                        raise NotImplementedError(
+                            f"Script has not been implemented for this {investmentValues['PrivateEquityFundStrategyType']} yet")
+
+                    _emit_section(xf, sections, 'hft')
 #
-            principalEx2Values = ['p' + str(i) for i in range(1, 11)]
-            principalEx2Values = df[df.xmlTags.isin(principalEx2Values)][['Id', 'XMLDescription', 'Input_1', 'Input_2', 'Input_3',
-                                                                          'Input_4', 'Input_5', 'Input_6', 'Input_7']].values.tolist()
-            PrincipalExposures = ET.SubElement(
-                AIFPrincipalInfo, 'PrincipalExposures')
-
-            for principalEx2Value in principalEx2Values:
-                PrincipalExposure = ET.SubElement(
-                    PrincipalExposures, 'PrincipalExposure')
-                Ranking = ET.SubElement(PrincipalExposure, 'Ranking')
-                Ranking.text = str(principalEx2Value[0]).strip()
-                AssetMacroType = ET.SubElement(
-                    PrincipalExposure, 'AssetMacroType')
-                AssetMacroType.text = str(principalEx2Value[1]).strip()
-
-                if principalEx2Value[1] != 'NTA':
-                    SubAssetType = ET.SubElement(
-                        PrincipalExposure, 'SubAssetType')
-                    SubAssetType.text = str(principalEx2Value[2]).strip()
-                    PositionType = ET.SubElement(
-                        PrincipalExposure, 'PositionType')
-                    PositionType.text = str(principalEx2Value[3]).strip()
-                    AggregatedValueAmount = ET.SubElement(
-                        PrincipalExposure, 'AggregatedValueAmount')
-                    AggregatedValueAmount.text = str(
-                        principalEx2Value[4]).strip()
-                    AggregatedValueRate = ET.SubElement(
-                        PrincipalExposure, 'AggregatedValueRate')
-                    AggregatedValueRate.text = str(
-                        principalEx2Value[5]).strip()
-
-                    if principalEx2Value[6] != '':
-                        CounterpartyIdentification = ET.SubElement(
-                            PrincipalExposure, 'CounterpartyIdentification')
-                        EntityName = ET.SubElement(
-                            CounterpartyIdentification, 'EntityName')
-                        EntityName.text = str(principalEx2Value[6]).strip()
-
-                    if principalEx2Value[8] != '':
-                        EntityIdentificationBIC = ET.SubElement(
-                            CounterpartyIdentification, 'EntityIdentificationBIC')
-                        EntityIdentificationBIC.text = str(
-                            principalEx2Value[8]).strip()
-
-                    if principalEx2Value[7] != '':
-                        EntityIdentificationLEI = ET.SubElement(
-                            CounterpartyIdentification, 'EntityIdentificationLEI')
-                        EntityIdentificationLEI.text = str(
-                            principalEx2Value[7]).strip()
+                principalExValues = _tagged(rows, rowsByTag, MAIN_INSTRUMENT_TAGS)
+                # upper case the position type column once instead of once per use
+                positionTypes = [str(value[-3]).upper() for value in principalExValues]
+
+                with xf.element('MainInstrumentsTraded'):
+                    for principalExValue, positionType in zip(principalExValues, positionTypes):
+                        with xf.element('MainInstrumentTraded'):
+                            _write(xf, 'Ranking', str(principalExValue[0]))
+                            _add(xf, 'SubAssetType', principalExValue[1], required=True)
+
+                            if principalExValue[1] != 'NTA_NTA_NOTA':
+                                _add(xf, 'InstrumentCodeType', principalExValue[2], required=True)
+                                _add(xf, 'InstrumentName', principalExValue[3], required=True)
+
+                            if principalExValue[2] == 'ISIN':
+                                _add(xf, 'ISINInstrumentIdentification',
+                                     principalExValue[4], required=True)
+
+                            if principalExValue[2] == 'AII':
+                                with xf.element('AIIInstrumentIdentification'):
+                                    _add(xf, 'AIIExchangeCode', principalExValue[5], required=True)
+                                    _add(xf, 'AIIDerivativeType', principalExValue[6], required=True)
+                                    _add(xf, 'AIIPutCallIdentifier', principalExValue[7], required=True)
+                                    _add(xf, 'AIIExpiryDate', principalExValue[8], required=True)
+                                    _add(xf, 'AIIStrikePrice', principalExValue[9], required=True)
+
+                            if principalExValue[1] != 'NTA_NTA_NOTA':
+                                _write(xf, 'PositionValue', str(principalExValue[-2]))
+                                _write(xf, 'PositionType', positionType)
+
+                            if positionType == 'S':
+                                _write(xf, 'ShortPositionHedgingRate', str(
+                                    principalExValue[-1]))
+                        xf.flush()
+
+                _emit_section(xf, sections, 'navGeographicalFocus')
 #
-            portfolioConcentration = ['q' + str(i) for i in range(1, 6)]
-            portfolioConcentration = df[df.xmlTags.isin(portfolioConcentration)][['Id', 'XMLDescription', 'Input_1', 'Input_2', 'Input_3',
-                                                                                  'Input_4', 'Input_5', 'Input_6', 'Input_7', 'Input_8']].values.tolist()
-            MostImportantConcentration = ET.SubElement(
-                AIFPrincipalInfo, 'MostImportantConcentration')
-            PortfolioConcentrations = ET.SubElement(
-                MostImportantConcentration, 'PortfolioConcentrations')
-
-            for value in portfolioConcentration:
-                PortfolioConcentration = ET.SubElement(
-                    PortfolioConcentrations, 'PortfolioConcentration')
-                Ranking = ET.SubElement(PortfolioConcentration, 'Ranking')
-                Ranking.text = str(value[0]).strip()
-                AssetType = ET.SubElement(
-                    PortfolioConcentration, 'AssetType')
-                AssetType.text = str(value[1]).strip()
-
-                if value[1] != 'NTA_NTA':
-                    PositionType = ET.SubElement(
-                        PortfolioConcentration, 'PositionType')
-                    PositionType.text = str(value[2]).strip()
-                    MarketIdentification = ET.SubElement(
-                        PortfolioConcentration, 'MarketIdentification')
-                    MarketCodeType = ET.SubElement(
-                        MarketIdentification, 'MarketCodeType')
-                    MarketCodeType.text = str(value[3]).strip()
-
-                if value[3] == "MIC":
-                    MarketCode = ET.SubElement(
-                        MarketIdentification, 'MarketCode')
-                    MarketCode.text = str(value[4]).strip()
-
-                AggregatedValueAmount = ET.SubElement(
-                    PortfolioConcentration, 'AggregatedValueAmount')
-                AggregatedValueAmount.text = str(value[5]).strip()
-                AggregatedValueRate = ET.SubElement(
-                    PortfolioConcentration, 'AggregatedValueRate')
-                AggregatedValueRate.text = str(value[6]).strip()
-
-                if value[3] == 'OTC' and value[7] != "":
-                    CounterpartyIdentification = ET.SubElement(
-                        PortfolioConcentration, 'CounterpartyIdentification')
-                    EntityName = ET.SubElement(
-                        CounterpartyIdentification, 'EntityName')
-                    EntityName.text = str(value[7]).strip()
-
-                if value[9] != '':
-                    EntityIdentificationBIC = ET.SubElement(
-                        CounterpartyIdentification, 'EntityIdentificationBIC')
-                    EntityIdentificationBIC.text = str(
-                        value[9]).strip()
-                if value[8] != '':
-                    EntityIdentificationLEI = ET.SubElement(
-                        CounterpartyIdentification, 'EntityIdentificationLEI')
-                    EntityIdentificationLEI.text = str(
-                        value[8]).strip()
-
-            typicalPositionSize = df[df.Id == '113']['Input_1'].values.tolist()[
-                0]
-            if jurisdictionValues['PredominantAIFType'] == "PEQF":
-                TypicalPositionSize = ET.SubElement(
-                    MostImportantConcentration, 'TypicalPositionSize')
-                TypicalPositionSize.text = str(typicalPositionSize).strip()
+                aumGeographicalFocus = dict(sections['aumGeographicalFocus'])
+                if aumGeographicalFocus:
+                    with xf.element('AUMGeographicalFocus'):
+                        for k, v in aumGeographicalFocus.items():
+                            _write(xf, k, str(v))
 #
-            markerts = ['r' + str(i) for i in range(1, 4)]
-            markerts = df[df.xmlTags.isin(
-                markerts)][['Id', 'XMLDescription', 'Input_1', 'Input_2']].values.tolist()
-            AIFPrincipalMarkets = ET.SubElement(
-                MostImportantConcentration, 'AIFPrincipalMarkets')
-
-            for market in markerts:
-                AIFPrincipalMarket = ET.SubElement(
-                    AIFPrincipalMarkets, 'AIFPrincipalMarket')
-                Ranking = ET.SubElement(AIFPrincipalMarket, 'Ranking')
-                Ranking.text = str(market[0]).strip()
-
-                if market[1] == "":
-                    raise EmptyValueError(
-                        "MarketIdentification cannot be empty")
-                MarketIdentification = ET.SubElement(
-                    AIFPrincipalMarket, 'MarketIdentification')
-                MarketCodeType = ET.SubElement(
-                    MarketIdentification, 'MarketCodeType')
-                MarketCodeType.text = str(market[1]).upper().strip()
-
-                if str(market[1]).upper().strip() == 'MIC' and market[2] == "":
-                    raise EmptyValueError("MarketCode cannot be empty")
-
-                if str(market[1]).upper().strip() == 'MIC':
-                    MarketCode = ET.SubElement(
-                        MarketIdentification, 'MarketCode')
-                    MarketCode.text = str(market[2]).strip()
-
-                if str(market[1]).upper().strip() != 'NOT' and market[3] == "":
-                    raise EmptyValueError("MarketCode cannot be empty")
-
-                if str(market[1]).upper().strip() != 'NOT':
-                    AggregatedValueAmount = ET.SubElement(
-                        AIFPrincipalMarket, 'AggregatedValueAmount')
-                    AggregatedValueAmount.text = str(market[3]).strip()
-
-            investorConcentration = [str(i) for i in range(118, 121)]
-            investorConcentration = df[df.Id.isin(investorConcentration)][[
-                'xmlTags', 'Input_1']].values.tolist()
-            investorConcentration = {i[0]: i[1] for i in investorConcentration}
-
-            InvestorConcentration = ET.SubElement(
-                MostImportantConcentration, 'InvestorConcentration')
-
-            for k, v in investorConcentration.items():
-                if v != "":
-                    k = ET.SubElement(InvestorConcentration, k)
-                    k.text = str(v).strip()
-                else:
-                    raise EmptyValueError(f"{k} cannot be empty")
+                principalEx2Values = _tagged(rows, rowsByTag, PRINCIPAL_EXPOSURE_TAGS, 10)
+
+                with xf.element('PrincipalExposures'):
+                    for principalEx2Value in principalEx2Values:
+                        with xf.element('PrincipalExposure'):
+                            _write(xf, 'Ranking', str(principalEx2Value[0]))
+                            _write(xf, 'AssetMacroType', str(principalEx2Value[1]))
+
+                            if principalEx2Value[1] != 'NTA':
+                                _write(xf, 'SubAssetType', str(principalEx2Value[2]))
+                                _write(xf, 'PositionType', str(principalEx2Value[3]))
+                                _write(xf, 'AggregatedValueAmount', str(
+                                    principalEx2Value[4]))
+                                _write(xf, 'AggregatedValueRate', str(
+                                    principalEx2Value[5]))
+
+                                if principalEx2Value[6] != '':
+                                    with xf.element('CounterpartyIdentification'):
+                                        _write(xf, 'EntityName', str(principalEx2Value[6]))
+
+                                        _add(xf, 'EntityIdentificationBIC', principalEx2Value[8])
+                                        _add(xf, 'EntityIdentificationLEI', principalEx2Value[7])
+                        xf.flush()
+#
+                portfolioConcentration = _tagged(rows, rowsByTag, PORTFOLIO_CONCENTRATION_TAGS, 11)
+
+                with xf.element('MostImportantConcentration'):
+                    with xf.element('PortfolioConcentrations'):
+                        for value in portfolioConcentration:
+                            with xf.element('PortfolioConcentration'):
+                                _write(xf, 'Ranking', str(value[0]))
+                                _write(xf, 'AssetType', str(value[1]))
+
+                                if value[1] != 'NTA_NTA':
+                                    _write(xf, 'PositionType', str(value[2]))
+                                    with xf.element('MarketIdentification'):
+                                        _write(xf, 'MarketCodeType', str(value[3]))
+
+                                        if value[3] == "MIC":
+                                            _write(xf, 'MarketCode', str(value[4]))
 
-        tree = ET.ElementTree(root)
-        tree.write(output + '.xml', encoding="UTF-8", xml_declaration=True)
+                                _write(xf, 'AggregatedValueAmount', str(value[5]))
+                                _write(xf, 'AggregatedValueRate', str(value[6]))
 
-    except Exception as e:
-        print(e)
+                                if value[3] == 'OTC' and value[7] != "":
+                                    with xf.element('CounterpartyIdentification'):
+                                        _write(xf, 'EntityName', str(value[7]))
+
+                                        _add(xf, 'EntityIdentificationBIC', value[9])
+                                        _add(xf, 'EntityIdentificationLEI', value[8])
+
+                    typicalPositionSize = sections['typicalPositionSize'][0][1]
+                    if jurisdictionValues['PredominantAIFType'] == "PEQF":
+                        _write(xf, 'TypicalPositionSize', str(typicalPositionSize))
+#
+                    markerts = _tagged(rows, rowsByTag, PRINCIPAL_MARKET_TAGS, 5)
+
+                    with xf.element('AIFPrincipalMarkets'):
+                        for market in markerts:
+                            with xf.element('AIFPrincipalMarket'):
+                                _write(xf, 'Ranking', str(market[0]))
+
+                                if market[1] == "":
+                                    raise EmptyValueError(
+                                        "MarketIdentification cannot be empty")
+                                marketCodeType = str(market[1]).upper()
+                                with xf.element('MarketIdentification'):
+                                    _write(xf, 'MarketCodeType', marketCodeType)
+
+                                    if marketCodeType == 'MIC' and market[2] == "":
+                                        raise EmptyValueError("MarketCode cannot be empty")
+
+                                    if marketCodeType == 'MIC':
+                                        _write(xf, 'MarketCode', str(market[2]))
+
+                                if marketCodeType != 'NOT' and market[3] == "":
+                                    raise EmptyValueError("MarketCode cannot be empty")
+
+                                if marketCodeType != 'NOT':
+                                    _write(xf, 'AggregatedValueAmount', str(market[3]))
+
+                    _emit_section(xf, sections, 'investorConcentration')
+    finally:
+        # worker processes exit without the logging shutdown hook, flush by hand
+        memory_handler.flush()
+
+
+def aif_xml(files):
+    """Get excel files and convert to XML.
+
+    Parameters
+    ----------
+    files : iterable of str
+        The file names of the spreadsheets, each one is converted in a worker process.
+
+
+    Raises
+    -------
+    EmptyValueError
+        if no input value is provided
+
+    DomainValueError
+        if input value is does not corresponds with the domain values required
+
+    LengthValueRequiredError
+        if value exceed the length of what is required
+
+    NoFilesFoundError
+        if no files are selected.
+
+    UnassinedIntegerError
+        if value is not an unsigned integer (not a negative number or contain decimal).
+
+    """
+    files = list(files)
+    try:
+        if len(files) == 0:
+            raise NoFilesFoundError(
+                "No excel files selected. Specify path to excel document and try again!")
+
+        generated_on = datetime.today().strftime('%Y-%m-%dT%H:%M:%S.0Z')
+
+        # workbooks are independent, convert them in parallel. Pending log records
+        # are flushed first so forked workers do not inherit and write them again.
+        memory_handler.flush()
+        with ProcessPoolExecutor() as executor:
+            reports = [executor.submit(_aif_report, file, generated_on) for file in files]
+            for report in as_completed(reports):
+                error = report.exception()
+                # an invalid template only skips its own report, anything else is a bug
+                if isinstance(error, Error):
+                    logger.error(error)
+                elif error is not None:
+                    raise error
+
+    except NoFilesFoundError as e:
+        logger.error(e)
+
+
+def _is_valid(file, xml_validator):
+    """Parse file and validate it against the schema in the same pass."""
+    parser = LT.XMLParser(schema=xml_validator)
+    try:
+        LT.parse(file, parser)
+    except LT.XMLSyntaxError:
+        return False
+    return True
 
 
 def validate_XML_AIF(files):
-    for file in files:
-        xml_file = LT.parse(file)
-        xml_validator = LT.XMLSchema(file="AIFMD_DATAIF_V1.2.xsd")
-        is_valid = xml_validator.validate(xml_file)
-        if is_valid:
-            logger.debug(f'{file} has successfully been validated!')
-        else:
-            logger.error(f'Validation for {file} was unsuccessful!')
+    # the schema is the same for every report, compile it only once
+    xml_validator = LT.XMLSchema(file="AIFMD_DATAIF_V1.2.xsd")
+    # lxml releases the GIL while parsing, so the reports are parsed in threads
+    with ThreadPoolExecutor() as executor:
+        for file, is_valid in zip(files, executor.map(_is_valid, files, repeat(xml_validator))):
+            if is_valid:
+                logger.debug('%s has successfully been validated!', file)
+            else:
+                logger.error('Validation for %s was unsuccessful!', file)
+
+
+def _list_files(suffixes):
+    """Return the names of the files in the working directory ending with one of suffixes."""
+    with os.scandir('.') as entries:
+        return [entry.name for entry in entries if entry.name.endswith(suffixes)]
 
 
 if __name__ == '__main__':
     path = 'Enter file path'
     os.chdir(path)
-    files = []
-    types = ('*.xls', '*.xlsx')
-    for ext in types:
-        files.extend(glob.glob(ext))
+    files = _list_files(('.xls', '.xlsx'))
     aif_xml(files)
-    xmls = glob.glob("*.xml")
+    xmls = _list_files('.xml')
     validate_XML_AIF(xmls)
@@ -8,7 +8,7 @@ location of the columns and the first column is the location of the indexes.
 This tool accepts only excel (.xls, .xlsx) files as inputs.
 
 Python 3.5 and above is required for executing this script. In addition the script requires that
-'pandas, xml, numpy, datetime', be installed within the Python
+'pandas, xml, datetime', be installed within the Python
 environment you are running this script in.
 
 
@@ -21,13 +21,15 @@ functions:
 """
 
 import pandas as pd
-import xml.etree.ElementTree as ET
 import os
 from datetime import datetime
-import numpy as np
-import glob
 import logging
+from logging.handlers import MemoryHandler
 import lxml.etree as LT
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from openpyxl import load_workbook
+from contextlib import contextmanager
 import sys
 
 # define Python user-defined exceptions
@@ -75,127 +77,174 @@ file_handler = logging.FileHandler('OFKReport.log')  # name of error log
 file_handler.setLevel(logging.ERROR)
 # format in which error should be reported
 file_handler.setFormatter(formatter)
+# keep error records in memory and write them to the log file in batches
+memory_handler = MemoryHandler(
+    capacity=1024, flushLevel=logging.CRITICAL, target=file_handler)
+memory_handler.setLevel(logging.ERROR)
 
 stream_handler = logging.StreamHandler()  # logging error to the console
 # format in which error should be reported
 stream_handler.setFormatter(formatter)
 
-logger.addHandler(file_handler)  # adding file_handler settings to the logger
+# adding the buffered file_handler settings to the logger
+logger.addHandler(memory_handler)
 # adding stream_handler settings to the logger
 logger.addHandler(stream_handler)
 
 
-def convert_to_xml(files):
-    """Get excel files and convert to XML.
+# Id of the template rows of every section, in the order they are written
+HEADER_ROWS = ('1', '2', '3')
+RECORD_INFO_ROWS = tuple(str(i) for i in range(4, 10))
+OBLIGATION_CHANGE_ROWS = tuple(str(i) for i in range(10, 16))
+AIFM_ROWS = tuple(str(i) for i in range(16, 22))
+IDENTIFIER_ROWS = tuple(str(i) for i in range(22, 26))
+PRINCIPAL_MARKET_ROWS = ('1st', '2nd', '3rd', '4th', '5th')
+# principal instruments are keyed by their (integer) ranking
+RANKS = (1, 2, 3, 4, 5)
+VALUES_ROWS = tuple(str(i) for i in range(33, 39))
 
-    Parameters
-    ----------
-    files : str
-        The file location of the spreadsheet.
 
-    output : str
-        Output name of the file.
+def _read_sheet(file, columns):
+    """Read the first sheet of a workbook into a DataFrame with the given columns.
 
+    .xlsx files are read with openpyxl's read-only row iterator, which skips
+    loading styles and the full workbook model. Legacy .xls files go through
+    pandas. Cells keep the type openpyxl returns, so whole numbers stay ints.
+    """
+    if file.endswith('.xlsx'):
+        workbook = load_workbook(file, read_only=True, data_only=True)
+        try:
+            rows = list(workbook.worksheets[0].iter_rows(
+                max_col=len(columns), values_only=True))
+        finally:
+            workbook.close()
+        return pd.DataFrame(rows, columns=columns, dtype=object)
 
-    Raises
-    -------
-    EmptyValueError
-        if no input value is provided
+    df = pd.read_excel(file, header=None, dtype=object)
+    df.columns = columns
+    return df
 
-    DomainValueError
-        if input value is does not corresponds with the domain values required
 
-    LengthValueRequiredError
-        if value exceed the length of what is required
+def _lookup(dfById, ids, columns):
+    """Return the columns of the rows with the given ids as lists, in the order of ids."""
+    ids = [i for i in ids if i in dfById.index]
+    return dfById.loc[ids, columns].to_numpy().tolist()
 
-    NoFilesFoundError
-        if no files are selected.
 
-    UnassinedIntegerError
-        if value is not an unsigned integer (not a negative number or contain decimal).
+def _section(dfById, ids):
+    """Return the xmlTags -> Input_1 mapping of the rows with the given ids."""
+    ids = [i for i in ids if i in dfById.index]
+    rows = dfById.loc[ids]
+    return dict(zip(rows['xmlTags'].tolist(), rows['Input_1'].tolist()))
 
 
+def _check_uint(value, message):
+    """Check that value is an unsigned integer.
+
+    Raises
+    -------
+    UnassinedIntegerError
+        If value is not an int or is negative.
     """
+    if type(value) != int or value < 0:
+        raise UnassinedIntegerError(message)
+
+
+@contextmanager
+def _xml_writer(path):
+    """Open an incremental xml writer on path.
 
+    The file is removed again if writing fails halfway, so no truncated
+    report is left behind for validation.
+    """
     try:
-        if len(files) == 0:
-            raise NoFilesFoundError(
-                "No excel files selected. Specify path to excel document and try again!")
+        # a 1 MiB buffer turns the many small writes into few large ones
+        with open(path, 'wb', buffering=1 << 20) as output, \
+                LT.xmlfile(output, encoding='UTF-8') as xf:
+            xf.write_declaration()
+            yield xf
+    except Exception:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
 
-        for file in files:
-            logger.debug(f'Generating xml for --> {file}\n')
-            output_file = os.path.splitext(file)[0]
-            df = pd.read_excel(file, header=None)
-            df = df.replace(np.nan, '', regex=True)
-            df.columns = ['xmlTags', 'Id',
-                          'XMLDescription', 'Input_1', 'Input_2']
-            df.xmlTags = df.xmlTags.str.strip('<>')
 
-            headerRows = [str(i) for i in range(1, 4)]
-            headerFileKeys = df[df.Id.isin(headerRows)][[
-                'xmlTags', 'Input_1']].values.tolist()
+def _write(xf, tag, text):
+    """Write a single element with the given text to the xml writer."""
+    element = LT.Element(tag)
+    element.text = text
+    xf.write(element)
+
+
+def _aifm_report(file):
+    """Convert a single AIFM workbook to an xml report next to it.
+
+    Runs in a worker process of convert_to_xml, see there for the raised errors.
+    """
+    try:
+        logger.debug('Generating xml for --> %s\n', file)
+        output_file = os.path.splitext(file)[0]
+        df = _read_sheet(file, ['xmlTags', 'Id',
+                                'XMLDescription', 'Input_1', 'Input_2'])
+        df = df.fillna('')
+        df.xmlTags = df.xmlTags.str.strip('<>')
+        # strip the text cells once here instead of at every element below
+        for column in ('XMLDescription', 'Input_1', 'Input_2'):
+            df[column] = df[column].map(
+                lambda v: v.strip() if isinstance(v, str) else v)
+        # index by Id once, every section below is a hashed label lookup
+        dfById = df.set_index('Id', drop=False)
+
+        headerFileKeys = _lookup(dfById, HEADER_ROWS, ['xmlTags', 'Input_1'])
+
+        if headerFileKeys[0][1] and headerFileKeys[1][1] == "":
+            raise EmptyValueError(
+                f" {headerFileKeys[0][0]} and {headerFileKeys[1][0]} fields cannot be empty! ")
+
+        generated_on = datetime.today().strftime('%Y-%m-%dT%H:%M:%S')
+        xsi = "http://www.w3.org/2001/XMLSchema-instance"
+        rootAttributes = {'{%s}noNamespaceSchemaLocation' % xsi: "AIFMD_DATMAN_V1.2.xsd",
+                          'CreationDateAndTime': generated_on,
+                          headerFileKeys[0][0]: str(headerFileKeys[0][1]),
+                          headerFileKeys[1][0]: str(headerFileKeys[1][1])}
+
+        # elements are streamed to disk as soon as they are complete
+        with _xml_writer(output_file + '.xml') as xf, \
+                xf.element('AIFMReportingInfo', rootAttributes, nsmap={'xsi': xsi}), \
+                xf.element('AIFMRecordInfo'):
+
+            headerSectionKeys = _section(dfById, RECORD_INFO_ROWS)
 
-            if headerFileKeys[0][1] and headerFileKeys[1][1] == "":
-                raise EmptyValueError(
-                    f" {headerFileKeys[0][0]} and {headerFileKeys[1][0]} fields cannot be empty! ")
-
-            generated_on = datetime.today().strftime('%Y-%m-%dT%H:%M:%S')
-            root = ET.Element('AIFMReportingInfo')
-            root.set("xsi:noNamespaceSchemaLocation", "AIFMD_DATMAN_V1.2.xsd")
-            root.set('CreationDateAndTime', generated_on)
-            root.set(headerFileKeys[0][0], str(headerFileKeys[0][1]).strip())
-            root.set(headerFileKeys[1][0], str(headerFileKeys[1][1]).strip())
-            root.set("xmlns:xsi", "http://www.w3.org/2001/XMLSchema-instance")
-
-            sectionRows = [str(i) for i in range(4, 10)]
-            headerSectionKeys = df[df.Id.isin(
-                sectionRows)][['xmlTags', 'Input_1']].values.tolist()
-            headerSectionKeys = {i[0]: i[1] for i in headerSectionKeys}
-
-            AIFMRecordInfo = ET.SubElement(root, 'AIFMRecordInfo')
             for k, v in headerSectionKeys.items():
                 if v != "":
                     if k not in ['ReportingPeriodStartDate', 'ReportingPeriodEndDate']:
-                        k = ET.SubElement(AIFMRecordInfo, k)
-                        k.text = str(v).strip()
+                        _write(xf, k, str(v))
                     else:
-                        k = ET.SubElement(AIFMRecordInfo, k)
-                        k.text = str(v.date()).strip()
+                        _write(xf, k, str(v.date()))
                 else:
                     raise EmptyValueError(f"{k} field cannot be empty!")
 
-            sectionRows = [str(i) for i in range(10, 16)]
-            headerSectionKeys = df[df.Id.isin(
-                sectionRows)][['xmlTags', 'Input_1']].values.tolist()
-            headerSectionKeys = {i[0]: i[1] for i in headerSectionKeys}
+            headerSectionKeys = _section(dfById, OBLIGATION_CHANGE_ROWS)
 #
             if headerSectionKeys['AIFMReportingObligationChangeFrequencyCode'] != "":
-                AIFMReportingObligationChangeFrequencyCode = ET.SubElement(
-                    AIFMRecordInfo, 'AIFMReportingObligationChangeFrequencyCode')
-                AIFMReportingObligationChangeFrequencyCode.text = str(
-                    headerSectionKeys['AIFMReportingObligationChangeFrequencyCode']).strip()
+                _write(xf, 'AIFMReportingObligationChangeFrequencyCode', str(
+                    headerSectionKeys['AIFMReportingObligationChangeFrequencyCode']))
 
             if headerSectionKeys['AIFMReportingObligationChangeContentsCode'] != "":
-                AIFMReportingObligationChangeContentsCode = ET.SubElement(
-                    AIFMRecordInfo, 'AIFMReportingObligationChangeContentsCode')
-                AIFMReportingObligationChangeContentsCode.text = str(
-                    headerSectionKeys['AIFMReportingObligationChangeContentsCode']).strip()
+                _write(xf, 'AIFMReportingObligationChangeContentsCode', str(
+                    headerSectionKeys['AIFMReportingObligationChangeContentsCode']))
 
             if headerSectionKeys['AIFMReportingObligationChangeFrequencyCode'] or headerSectionKeys['AIFMReportingObligationChangeContentsCode'] != "":
                 if headerSectionKeys['AIFMReportingObligationChangeQuarter'] != "":
-                    AIFMReportingObligationChangeQuarter = ET.SubElement(
-                        AIFMRecordInfo, 'AIFMReportingObligationChangeQuarter')
-                    AIFMReportingObligationChangeQuarter.text = str(
-                        headerSectionKeys['AIFMReportingObligationChangeQuarter']).strip()
+                    _write(xf, 'AIFMReportingObligationChangeQuarter', str(
+                        headerSectionKeys['AIFMReportingObligationChangeQuarter']))
                 else:
                     raise EmptyValueError(
                         "AIFMReportingObligationChangeQuarter field cannot be empty!")
 
             if headerSectionKeys['LastReportingFlag'] != "":
-                LastReportingFlag = ET.SubElement(
-                    AIFMRecordInfo, 'LastReportingFlag')
-                LastReportingFlag.text = str(
-                    headerSectionKeys['LastReportingFlag']).lower().strip()
+                _write(xf, 'LastReportingFlag', str(
+                    headerSectionKeys['LastReportingFlag']).lower())
             else:
                 raise EmptyValueError(
                     "LastReportingFlag field cannot be empty!")
@@ -205,230 +254,222 @@ def convert_to_xml(files):
                     raise LengthValueRequiredError(
                         f'AssumptionDescription string required in this field should not be greater 300!')
 
-                QuestionNumber = ET.SubElement(
-                    AIFMRecordInfo, 'QuestionNumber')
-                QuestionNumber.text = str(
-                    headerSectionKeys['QuestionNumber']).strip()
-                AssumptionDescription = ET.SubElement(
-                    AIFMRecordInfo, 'AssumptionDescription')
-                AssumptionDescription.text = str(
-                    headerSectionKeys['AssumptionDescription']).strip()
-
-            sectionRows = [str(i) for i in range(16, 22)]
-            headerSectionKeys = df[df.Id.isin(
-                sectionRows)][['xmlTags', 'Input_1']].values.tolist()
-            headerSectionKeys = {i[0]: i[1] for i in headerSectionKeys}
+                _write(xf, 'QuestionNumber', str(
+                    headerSectionKeys['QuestionNumber']))
+                _write(xf, 'AssumptionDescription', str(
+                    headerSectionKeys['AssumptionDescription']))
+
+            headerSectionKeys = _section(dfById, AIFM_ROWS)
             for k, v in headerSectionKeys.items():
                 if v != "":
-                    k = ET.SubElement(AIFMRecordInfo, k)
-                    k.text = str(v).strip()
+                    _write(xf, k, str(v))
                 else:
                     raise EmptyValueError(f"{k} field cannot be empty!")
 
-            identifierRows = [str(i) for i in range(22, 26)]
-            AIMFIdentifiers = df[df.Id.isin(identifierRows)][[
-                'xmlTags', 'Input_1']].values.tolist()
-            AIMFIdentifiers = {i[0]: i[1] for i in AIMFIdentifiers}
-
-            AIFMCompleteDescription = ET.SubElement(
-                AIFMRecordInfo, 'AIFMCompleteDescription')
-
-            if AIMFIdentifiers:
-                AIFMIdentifier = ET.SubElement(
-                    AIFMCompleteDescription, 'AIFMIdentifier')
-
-                if AIMFIdentifiers['AIFMIdentifierLEI'] != "":
-                    AIFMIdentifierLEI = ET.SubElement(
-                        AIFMIdentifier, 'AIFMIdentifierLEI')
-                    AIFMIdentifierLEI.text = str(
-                        AIMFIdentifiers['AIFMIdentifierLEI']).strip()
-
-                if AIMFIdentifiers['AIFMIdentifierBIC'] != "":
-                    AIFMIdentifierBIC = ET.SubElement(
-                        AIFMIdentifier, 'AIFMIdentifierBIC')
-                    AIFMIdentifierBIC.text = str(
-                        AIMFIdentifiers['AIFMIdentifierBIC']).strip()
-
-                if AIMFIdentifiers['ReportingMemberState'] and AIMFIdentifiers['ReportingMemberState'] != "":
-                    ReportingMemberState = ET.SubElement(
-                        AIFMIdentifier, 'ReportingMemberState')
-                    ReportingMemberState.text = str(
-                        AIMFIdentifiers['ReportingMemberState']).strip()
-                    AIFMNationalCode = ET.SubElement(
-                        AIFMIdentifier, 'AIFMNationalCode')
-                    AIFMNationalCode.text = str(
-                        AIMFIdentifiers['AIFMNationalCode']).strip()
-
-            ranks = [i for i in range(1, 6)]
-            principalMRows = ['1st', '2nd', '3rd', '4th', '5th']
-            principalMarkets = df[df.Id.isin(principalMRows)][[
-                'XMLDescription', 'Input_1', 'Input_2']].values.tolist()
-
-            counter = 0
-            AIFMPrincipalMarkets = ET.SubElement(
-                AIFMCompleteDescription, 'AIFMPrincipalMarkets')
-
-            for principalMarket in principalMarkets:
-                if principalMarket[0] in ['MIC', 'XXX', 'OTC', 'NOT']:
-                    AIFMFivePrincipalMarket = ET.SubElement(
-                        AIFMPrincipalMarkets, 'AIFMFivePrincipalMarket')
-                    Ranking = ET.SubElement(
-                        AIFMFivePrincipalMarket, 'Ranking')
-                    Ranking.text = str(ranks[counter]).strip()
-                    MarketIdentification = ET.SubElement(
-                        AIFMFivePrincipalMarket, 'MarketIdentification')
-                    MarketCodeType = ET.SubElement(
-                        MarketIdentification, 'MarketCodeType')
-                    MarketCodeType.text = str(principalMarket[0]).strip()
-
-                    if principalMarket[0] == "MIC" and principalMarket[1] == "":
-                        raise EmptyValueError(
-                            "MarketCode is required for MIC market codes!")
+            AIMFIdentifiers = _section(dfById, IDENTIFIER_ROWS)
+
+            with xf.element('AIFMCompleteDescription'):
+
+                if AIMFIdentifiers:
+                    with xf.element('AIFMIdentifier'):
+
+                        if AIMFIdentifiers['AIFMIdentifierLEI'] != "":
+                            _write(xf, 'AIFMIdentifierLEI', str(
+                                AIMFIdentifiers['AIFMIdentifierLEI']))
+
+                        if AIMFIdentifiers['AIFMIdentifierBIC'] != "":
+                            _write(xf, 'AIFMIdentifierBIC', str(
+                                AIMFIdentifiers['AIFMIdentifierBIC']))
+
+                        if AIMFIdentifiers['ReportingMemberState'] and AIMFIdentifiers['ReportingMemberState'] != "":
+                            _write(xf, 'ReportingMemberState', str(
+                                AIMFIdentifiers['ReportingMemberState']))
+                            _write(xf, 'AIFMNationalCode', str(
+                                AIMFIdentifiers['AIFMNationalCode']))
+
+                principalMarkets = _lookup(dfById, PRINCIPAL_MARKET_ROWS, ['XMLDescription', 'Input_1', 'Input_2'])
+
+                counter = 0
+                with xf.element('AIFMPrincipalMarkets'):
+
+                    for principalMarket in principalMarkets:
+                        if principalMarket[0] in ['MIC', 'XXX', 'OTC', 'NOT']:
+                            with xf.element('AIFMFivePrincipalMarket'):
+                                _write(xf, 'Ranking', str(RANKS[counter]))
+
+                                if principalMarket[0] == "MIC" and principalMarket[1] == "":
+                                    raise EmptyValueError(
+                                        "MarketCode is required for MIC market codes!")
 #
-                    if principalMarket[0] == "MIC" and len(principalMarket[1]) > 4:
-                        raise LengthValueRequiredError(
-                            f'Maximum length of 4 is required for MarketCode!')
-
-                    if principalMarket[0] == "MIC":
-                        MarketCode = ET.SubElement(
-                            MarketIdentification, 'MarketCode')
-                        MarketCode.text = str(principalMarket[1]).strip()
+                                if principalMarket[0] == "MIC" and len(principalMarket[1]) > 4:
+                                    raise LengthValueRequiredError(
+                                        f'Maximum length of 4 is required for MarketCode!')
+
+                                with xf.element('MarketIdentification'):
+                                    _write(xf, 'MarketCodeType', str(principalMarket[0]))
+
+                                    if principalMarket[0] == "MIC":
+                                        _write(xf, 'MarketCode', str(principalMarket[1]))
 #
-                    if principalMarket[0] != "NOT":
-                        if type(principalMarket[2]) != int or principalMarket[2] < 0:
-                            raise UnassinedIntegerError(
-                                "AggregatedValueAmount must be not contain decimals & should not be a negative number. Check value in row 32-36 column D")
-                        else:
-                            AggregatedValueAmount = ET.SubElement(
-                                AIFMFivePrincipalMarket, 'AggregatedValueAmount')
-                            AggregatedValueAmount.text = str(
-                                principalMarket[2]).strip()
+                                if principalMarket[0] != "NOT":
+                                    _check_uint(
+                                        principalMarket[2], "AggregatedValueAmount must be not contain decimals & should not be a negative number. Check value in row 32-36 column D")
+                                    _write(xf, 'AggregatedValueAmount', str(
+                                        principalMarket[2]))
 
-                    counter += 1
+                            counter += 1
 
-                else:
-                    raise DomainValueError(
-                        "Required principal market values in for AIFM trades are 'MIC', 'XXX', 'OTC' & 'NOT'. Check values in rows 32-36, column C of template")
+                        else:
+                            raise DomainValueError(
+                                "Required principal market values in for AIFM trades are 'MIC', 'XXX', 'OTC' & 'NOT'. Check values in rows 32-36, column C of template")
 #
 
-            principalIRow = [i for i in range(1, 6)]
-            principalInstruments = df[df.Id.isin(principalIRow)][[
-                'Id', 'XMLDescription', 'Input_1']].values.tolist()
+                principalInstruments = _lookup(dfById, RANKS, ['Id', 'XMLDescription', 'Input_1'])
 
-            AIFMPrincipalInstruments = ET.SubElement(
-                AIFMCompleteDescription, 'AIFMPrincipalInstruments')
+                with xf.element('AIFMPrincipalInstruments'):
 
-            for principalInstrument in principalInstruments:
-                if principalInstrument[1] == "":
-                    raise EmptyValueError(
-                        f"SubAssetType field cannot be empty! Check values in rows 40-44, column C of template")
+                    for principalInstrument in principalInstruments:
+                        if principalInstrument[1] == "":
+                            raise EmptyValueError(
+                                f"SubAssetType field cannot be empty! Check values in rows 40-44, column C of template")
+
+                        if principalInstrument[2] == "":
+                            raise EmptyValueError(
+                                f"AggregatedValueAmount field cannot be empty! Check values in rows 40-44, column C of template")
+
+                        with xf.element('AIFMPrincipalInstrument'):
+                            _write(xf, 'Ranking', str(principalInstrument[0]))
+                            _write(xf, 'SubAssetType', str(principalInstrument[1]))
+
+                            if principalInstrument[1] != 'NTA_NTA_NOTA':
+                                _check_uint(
+                                    principalInstrument[2], "AggregatedValueAmount must be UnassigneIinteger (not contain decimals & not negative). Check value in row 40-44 column D")
+                                _write(xf, 'AggregatedValueAmount', str(
+                                    principalInstrument[2]))
 
-                if principalInstrument[2] == "":
+                principalValues = _section(dfById, VALUES_ROWS)
+
+                if principalValues['AUMAmountInEuro'] != "":
+                    _check_uint(
+                        principalValues['AUMAmountInEuro'], "AUMAmountInEuro must be UnassigneIinteger (not contain decimals and not negative). Check value in row 46 column D")
+
+                    _write(xf, 'AUMAmountInEuro', str(
+                        principalValues['AUMAmountInEuro']))
+                else:
                     raise EmptyValueError(
-                        f"AggregatedValueAmount field cannot be empty! Check values in rows 40-44, column C of template")
-
-                AIFMPrincipalInstrument = ET.SubElement(
-                    AIFMPrincipalInstruments, 'AIFMPrincipalInstrument')
-                Ranking = ET.SubElement(AIFMPrincipalInstrument, 'Ranking')
-                Ranking.text = str(principalInstrument[0]).strip()
-                SubAssetType = ET.SubElement(
-                    AIFMPrincipalInstrument, 'SubAssetType')
-                SubAssetType.text = str(principalInstrument[1]).strip()
-
-                if principalInstrument[1] != 'NTA_NTA_NOTA':
-                    if type(principalInstrument[2]) != int or principalInstrument[2] < 0:
-                        raise UnassinedIntegerError(
-                            "AggregatedValueAmount must be UnassigneIinteger (not contain decimals & not negative). Check value in row 40-44 column D")
-                    else:
-                        AggregatedValueAmount = ET.SubElement(
-                            AIFMPrincipalInstrument, 'AggregatedValueAmount')
-                        AggregatedValueAmount.text = str(
-                            principalInstrument[2]).strip()
-
-            valuesRows = (str(i) for i in range(33, 39))
-            principalValues = df[df.Id.isin(
-                valuesRows)][['xmlTags', 'Input_1']].values.tolist()
-            principalValues = {i[0]: i[1] for i in principalValues}
-
-            if principalValues['AUMAmountInEuro'] != "":
-                if type(principalValues['AUMAmountInEuro']) != int or principalValues['AUMAmountInEuro'] < 0:
-                    raise UnassinedIntegerError(
-                        "AUMAmountInEuro must be UnassigneIinteger (not contain decimals and not negative). Check value in row 46 column D")
-
-                AUMAmountInEuro = ET.SubElement(
-                    AIFMCompleteDescription, 'AUMAmountInEuro')
-                AUMAmountInEuro.text = str(
-                    principalValues['AUMAmountInEuro']).strip()
-            else:
-                raise EmptyValueError(
-                    f"AUMAmountInEuro field cannot be empty! Check value in row 46 column D")
-
-            AIFMBaseCurrencyDescription = ET.SubElement(
-                AIFMCompleteDescription, 'AIFMBaseCurrencyDescription')
-
-            if principalValues['AUMAmountInBaseCurrency'] and principalValues['BaseCurrency'] != "":
-                if type(principalValues['AUMAmountInBaseCurrency']) != int or principalValues['AUMAmountInBaseCurrency'] < 0:
-                    raise UnassinedIntegerError(
-                        "AUMAmountInBaseCurrency must be UnassigneIinteger (not contain decimals & not negative). Check value in row 47 column D")
-
-                BaseCurrency = ET.SubElement(
-                    AIFMBaseCurrencyDescription, 'BaseCurrency')
-                BaseCurrency.text = str(
-                    principalValues['BaseCurrency']).upper().strip()
-
-                AUMAmountInBaseCurrency = ET.SubElement(
-                    AIFMBaseCurrencyDescription, 'AUMAmountInBaseCurrency')
-                AUMAmountInBaseCurrency.text = str(
-                    principalValues['AUMAmountInBaseCurrency']).strip()
-
-                if str(principalValues['BaseCurrency']).upper().strip() != "EUR":
-                    if principalValues['FXEURReferenceRateType'] and principalValues['FXEURRate'] != "":
-                        FXEURReferenceRateType = ET.SubElement(
-                            AIFMBaseCurrencyDescription, 'FXEURReferenceRateType')
-                        FXEURReferenceRateType.text = str(
-                            principalValues['FXEURReferenceRateType']).strip()
-                        FXEURRate = ET.SubElement(
-                            AIFMBaseCurrencyDescription, 'FXEURRate')
-                        FXEURRate.text = str(
-                            principalValues['FXEURRate']).strip()
-                    else:
-                        raise EmptyValueError(
-                            f"FXEURReferenceRateType or FXEURRate fields cannot be empty! Check value in rows 49-50 column D")
+                        f"AUMAmountInEuro field cannot be empty! Check value in row 46 column D")
+
+                with xf.element('AIFMBaseCurrencyDescription'):
+
+                    if principalValues['AUMAmountInBaseCurrency'] and principalValues['BaseCurrency'] != "":
+                        _check_uint(
+                            principalValues['AUMAmountInBaseCurrency'], "AUMAmountInBaseCurrency must be UnassigneIinteger (not contain decimals & not negative). Check value in row 47 column D")
+
+                        baseCurrency = str(principalValues['BaseCurrency']).upper()
+                        _write(xf, 'BaseCurrency', baseCurrency)
+                        _write(xf, 'AUMAmountInBaseCurrency', str(
+                            principalValues['AUMAmountInBaseCurrency']))
+
+                        if baseCurrency != "EUR":
+                            if principalValues['FXEURReferenceRateType'] and principalValues['FXEURRate'] != "":
+                                _write(xf, 'FXEURReferenceRateType', str(
+                                    principalValues['FXEURReferenceRateType']))
+                                _write(xf, 'FXEURRate', str(
+                                    principalValues['FXEURRate']))
+                            else:
+                                raise EmptyValueError(
+                                    f"FXEURReferenceRateType or FXEURRate fields cannot be empty! Check value in rows 49-50 column D")
+
+                        if baseCurrency or principalValues['FXEUROtherReferenceRateDescription'] == "OTH":
+                            _write(xf, 'FXEUROtherReferenceRateDescription', str(
+                                principalValues['FXEUROtherReferenceRateDescription']))
+
+        logger.debug('Done generating xml for %s\n', file)
+    finally:
+        # worker processes exit without the logging shutdown hook, flush by hand
+        memory_handler.flush()
 
-                if str(principalValues['BaseCurrency']).upper().strip() or principalValues['FXEUROtherReferenceRateDescription'] == "OTH":
-                    FXEUROtherReferenceRateDescription = ET.SubElement(
-                        AIFMBaseCurrencyDescription, 'FXEUROtherReferenceRateDescription')
-                    FXEUROtherReferenceRateDescription.text = str(
-                        principalValues['FXEUROtherReferenceRateDescription']).strip()
 
-            tree = ET.ElementTree(root)
-            tree.write(output_file + '.xml',
-                       encoding="UTF-8", xml_declaration=True)
-            logger.debug(f'Done generating xml for {file}\n')
+def convert_to_xml(files):
+    """Get excel files and convert to XML.
+
+    Parameters
+    ----------
+    files : iterable of str
+        The file names of the spreadsheets, each one is converted in a worker process.
+
+
+    Raises
+    -------
+    EmptyValueError
+        if no input value is provided
+
+    DomainValueError
+        if input value is does not corresponds with the domain values required
+
+    LengthValueRequiredError
+        if value exceed the length of what is required
+
+    NoFilesFoundError
+        if no files are selected.
+
+    UnassinedIntegerError
+        if value is not an unsigned integer (not a negative number or contain decimal).
+
+
+    """
+
+    try:
+        if len(files) == 0:
+            raise NoFilesFoundError(
+                "No excel files selected. Specify path to excel document and try again!")
+
+        # workbooks are independent, convert them in parallel. Pending log records
+        # are flushed first so forked workers do not inherit and write them again.
+        memory_handler.flush()
+        with ProcessPoolExecutor() as executor:
+            reports = [executor.submit(_aifm_report, file) for file in files]
+            for report in as_completed(reports):
+                if report.exception() is not None:
+                    logger.error(report.exception())
 
     except Exception as e:
         logger.error(e)
 
 
+def _is_valid(file, xml_validator):
+    """Parse file and validate it against the schema in the same pass."""
+    parser = LT.XMLParser(schema=xml_validator)
+    try:
+        LT.parse(file, parser)
+    except LT.XMLSyntaxError:
+        return False
+    return True
+
+
 def validate_XML_AIFM(files):
-    for file in files:
-        xml_file = LT.parse(file)
-        xml_validator = LT.XMLSchema(file="AIFMD_DATMAN_V1.2.xsd")
-        is_valid = xml_validator.validate(xml_file)
-        if is_valid:
-            logger.debug(f'{file} has successfully been validated!')
-        else:
-            logger.error(f'Validation for {file} was unsuccessful!')
+    # the schema is the same for every report, compile it only once
+    xml_validator = LT.XMLSchema(file="AIFMD_DATMAN_V1.2.xsd")
+    # lxml releases the GIL while parsing, so the reports are parsed in threads
+    with ThreadPoolExecutor() as executor:
+        for file, is_valid in zip(files, executor.map(_is_valid, files, repeat(xml_validator))):
+            if is_valid:
+                logger.debug('%s has successfully been validated!', file)
+            else:
+                logger.error('Validation for %s was unsuccessful!', file)
+
+
+def _list_files(suffixes):
+    """Return the names of the files in the working directory ending with one of suffixes."""
+    with os.scandir('.') as entries:
+        return [entry.name for entry in entries if entry.name.endswith(suffixes)]
 
 
 if __name__ == '__main__':
     path = 'Enter path for the file'
     os.chdir(path)
-    files = []
-    types = ('*.xls', '*.xlsx')
-    for ext in types:
-        files.extend(glob.glob(ext))
+    files = _list_files(('.xls', '.xlsx'))
     convert_to_xml(files)
-    xmls = glob.glob("*.xml")
+    xmls = _list_files('.xml')
     validate_XML_AIFM(xmls)
     sys.exit(0)
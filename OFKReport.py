@@ -21,13 +21,25 @@ functions:
 """
 
 import pandas as pd
-import xml.etree.ElementTree as ET
 import os
-from datetime import datetime
+from datetime import date
 import numpy as np
-import glob
 import lxml.etree as LT
 import logging
+from logging.handlers import MemoryHandler
+from types import MappingProxyType
+from functools import lru_cache, partial
+from itertools import repeat
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+try:
+    # the Rust based calamine reader parses workbooks several times faster
+    import python_calamine  # noqa: F401
+    EXCEL_ENGINE = 'calamine'
+except ImportError:
+    # pandas falls back to openpyxl in read-only mode for .xlsx and xlrd for .xls
+    EXCEL_ENGINE = None
 
 # This code is used for logging errors
 logger = logging.getLogger(__name__)
@@ -40,12 +52,17 @@ file_handler = logging.FileHandler('OFKReport.log')  # name of error log
 file_handler.setLevel(logging.ERROR)
 # format in which error should be reported
 file_handler.setFormatter(formatter)
+# keep error records in memory and write them to the log file in batches
+memory_handler = MemoryHandler(
+    capacity=1024, flushLevel=logging.CRITICAL, target=file_handler)
+memory_handler.setLevel(logging.ERROR)
 
 stream_handler = logging.StreamHandler()  # logging error to the console
 # format in which error should be reported
 stream_handler.setFormatter(formatter)
 
-logger.addHandler(file_handler)  # adding file_handler settings to the logger
+# adding the buffered file_handler settings to the logger
+logger.addHandler(memory_handler)
 # adding stream_handler settings to the logger
 logger.addHandler(stream_handler)
 
@@ -76,6 +93,400 @@ class LengthValueRequiredError(Error):
     pass
 
 
+OFK_NAMESPACE = "bb.dnb.nl"
+XSI_NAMESPACE = "http://www.w3.org/2001/XMLSchema-instance"
+
+# control (regel) tag of every subform, shared by all reports
+SUBFORM_REGELTAG = MappingProxyType({'AD-A': 'AlgDeeln', 'AD-C': 'DeelnAct', 'ADO-C': 'OnrGoed', 'AEB-A': 'Aandelen',
+                                     'AEB-AI': 'Aandelen', 'AEBB-A': 'Aandelen', 'AEBB-AI': 'Aandelen', 'AEBB-G': 'GeldmarktPap',
+                                     'AEBB-K': 'KapitaalmarktPap', 'AEBB-KGI': 'Schuldpapier', 'AEB-G': 'GeldmarktPap', 'AEB-K': 'KapitaalmarktPap',
+                                     'AEB-KGI': 'Schuldpapier', 'AEI-A': 'Aandelen', 'AEI-AI': 'Aandelen', 'AEI-G': 'GeldmarktPap', 'AEI-K': 'KapitaalmarktPap',
+                                     'AEI-KGI': 'Schuldpapier', 'AEL-A': 'Aandelen', 'AEL-AI': 'Aandelen', 'AEL-G': 'GeldmarktPap', 'AEL-K': 'KapitaalmarktPap',
+                                     'AEL-KGI': 'Schuldpapier', 'AEN-A': 'Aandelen', 'AEN-AI': 'Aandelen', 'AENB-A': 'Aandelen', 'AENB-AI': 'Aandelen',
+                                     'AENB-G': 'GeldmarktPap', 'AENB-K': 'KapitaalmarktPap', 'AENB-KGI': 'Schuldpapier', 'AENL-A': 'Aandelen',
+                                     'AENL-AI': 'Aandelen', 'AENL-G': 'GeldmarktPap', 'AENL-K': 'KapitaalmarktPap', 'AENL-KGI': 'Schuldpapier',
+                                     'AEN-G': 'GeldmarktPap', 'AEN-K': 'KapitaalmarktPap', 'AEN-KGI': 'Schuldpapier', 'AEU-A': 'Aandelen',
+                                     'AEU-AI': 'Aandelen', 'AEU-G': 'GeldmarktPap', 'AEU-K': 'KapitaalmarktPap', 'AEU-KGI': 'Schuldpapier',
+                                     'ANF-C': 'ActivaNietFin', 'ANF-CGM': 'ActivaNietFin', 'ANF-CGJ': 'ActivaNietFin', 'AO-DI': 'DeelnIntInst',
+                                     'AOE-A': 'Aandelen', 'AOE-AI': 'Aandelen', 'AOE-G': 'GeldmarktPap', 'AOE-K': 'KapitaalmarktPap',
+                                     'AOE-KGI': 'Schuldpapier', 'AO-FL': 'LeasesUG', 'AO-HK': 'HandUGK', 'AO-HL': 'HandUGL',
+                                     'AO-HY': 'HypoUG', 'AO-LK': 'LeningUGK', 'AO-LL': 'LeningUGL', 'AO-OK': 'OverigeUGK',
+                                     'AO-OL': 'OverigeUGL', 'AO-RC': 'RecCourant', 'AO-RP': 'RepoUG', 'AR': 'StichKap', 'AV-LP': 'TechVoorz',
+                                     'AV-VV': 'LopenAanspr', 'BENB-A': 'Aandelen', 'BENB-AI': 'Aandelen', 'BENB-G': 'GeldmarktPap',
+                                     'BENB-K': 'KapitaalmarktPap', 'BENB-KGI': 'Schuldpapier', 'BT': 'BalansTotaal', 'D-FB': 'Futures',
+                                     'D-FN': 'Futures', 'DO-FB': 'Futures', 'D-OK': 'OptiesGekocht', 'DO-OK': 'OptiesGekocht', 'DO-OS': 'OptiesGeschr',
+                                     'DO-OTR': 'OTCDerivaten', 'DO-OTV': 'OTVDerivaten', 'D-OS': 'OptiesGeschr', 'D-OTR': 'OTCDerivaten', 'D-OTV': 'OTVDerivaten',
+                                     'IO-GO': 'OntwHulpGebond', 'IO-OO': 'OntwHulpSchenk', 'IO-XH': 'InkomOverdracht', 'GD-ECM': 'DienstExtraConcern',
+                                     'GD-ICM': 'DienstIntraConcern', 'GD-GLM': 'RandLGebruiksLicent', 'GD-RLM': 'RandLReprodLicent', 'GD-ECJ': 'DienstExtraConcern',
+                                     'GD-ICJ': 'DienstIntraConcern', 'GD-GLJ': 'RandLGebruiksLicent', 'GD-RLJ': 'RandLReprodLicent', 'IWB': 'IntrWaarde',
+                                     'KO-KW': 'SchuldKwijtSch', 'KO-OG': 'OnrGoedBtlOv', 'KO-SR': 'Stamrechten', 'KO-VO': 'OverKapitOverdr',
+                                     'PD-A': 'AlgDeeln', 'PD-C': 'DeelnPass', 'PEN-A': 'Aandelen', 'PEN-AI': 'Aandelen', 'PENB-A': 'Aandelen',
+                                     'PENB-AI': 'Aandelen', 'PENB-G': 'GeldmarktPap', 'PENB-K': 'KapitaalmarktPap', 'PENB-KGI': 'Schuldpapier',
+                                     'PENL-A': 'Aandelen', 'PENL-AI': 'Aandelen', 'PENL-G': 'GeldmarktPap', 'PENL-K': 'KapitaalmarktPap',
+                                     'PENL-KGI': 'Schuldpapier', 'PEN-G': 'GeldmarktPap', 'PEN-K': 'KapitaalmarktPap', 'PEN-KGI': 'Schuldpapier',
+                                     'PN-OS': 'NedTegenpartij', 'PO-FL': 'LeasesOG', 'PO-HK': 'HandOGK', 'PO-HL': 'HandOGL', 'PO-LK': 'LeningOGK',
+                                     'PO-LL': 'LeningOGL', 'PO-OK': 'OverigeOGK', 'PO-OL': 'OverigeOGL', 'PO-RP': 'RepoOG', 'PV-LP': 'TechVoorz',
+                                     'PV-OV': 'OverVoorz', 'PV-VV': 'LopenAanspr', 'SB-K': 'ParticipatieUGK', 'SB-L': 'ParticipatieUGL',
+                                     'SN-K': 'ParticipatieOGK', 'SN-L': 'ParticipatieOGL', 'WE-A': 'Aandelen', 'WE-AI': 'Aandelen', 'WE-G': 'GeldmarktPap',
+                                     'WE-K': 'KapitaalmarktPap', 'WE-KGI': 'Schuldpapier', 'WI-A': 'Aandelen', 'WI-AI': 'Aandelen', 'WI-G': 'GeldmarktPap',
+                                     'WI-K': 'KapitaalmarktPap', 'WI-KGI': 'Schuldpapier', 'WVA-B': 'Bestemming', 'WVA-R': 'Resulaten', 'WVA-Z': 'Resulaten',
+                                     'WVB-B': 'Baten', 'WVB-L': 'Bedrijfskosten', 'WVB-O': 'Bedrijfskosten', 'WVB-S': 'Loonkosten', 'WVP': 'WinstVerlPremUitk',
+                                     'WVP-ZA': 'AanvZorg', 'WVP-ZZ': 'ZorgZvw', 'WVT-BL': 'TotBatenLasten', 'WVU-B': 'WinstVerlBuiten', 'WVU-L': 'LatenUitz'})
+
+# positions of the columns DNB has explicitly blocked for values to be populated, per worksheet
+DROP_COLUMNS = {'AD-C': (-1,), 'PD-C': (-1,),
+                'AEB-A': (1, 11, 12, 13, 14, 15, 16), 'AEN-A': (1, 11, 12, 13, 14, 15, 16),
+                'AEB-AI': (2, 3, 7, 8, 11, 12, 13, 14, 15, 16),
+                'AEB-G': (1, 17), 'AEB-K': (1, 17), 'AEN-G': (1, 17), 'AEN-K': (1, 17),
+                'AEB-KGI': (2, 3, 7, 8, 11, 12, 15, 16, 17),
+                'AEN-AI': (3, 7, 8, 11, 12, 13, 14, 15, 16),
+                'AEN-KGI': (3, 7, 8, 11, 12, 15, 16, 17),
+                'AO-FL': (13,), 'AO-HL': (13,), 'AO-LK': (13,), 'AO-LL': (13,), 'AO-RP': (13,),
+                'AO-HY': (2, 13),
+                'AO-OK': (10, 11, 13, 14, 15), 'AO-OL': (10, 11, 13, 14, 15),
+                'AO-RC': (10, 11, 14, 15),
+                'D-FB': (1, 3, 4, 7, 8, 9, 10),
+                'D-OK': (1, 7, 8), 'D-OS': (1, 7, 8),
+                'D-OTR': (1, 8, 9), 'D-OTV': (1, 8, 9),
+                'PEN-A': (1, 10, 11, 12, 13, 14, 15),
+                'PEN-AI': (6, 7, 10, 11, 12, 13, 14, 15),
+                'PEN-KGI': (6, 7, 10, 11, 14, 15, 16),
+                'PEN-G': (1, 16), 'PEN-K': (1, 16),
+                'PO-OK': (10, 11, 12, 14, 15), 'PO-OL': (10, 11, 12, 14, 15),
+                'PV-OV': (1, 2),
+                'PO-FL': (12,), 'PO-HL': (12,), 'PO-LK': (12,), 'PO-LL': (12,), 'PO-RP': (12,),
+                'WVA-B': (1,),
+                'WVB-B': (1, 3), 'WVB-L': (1, 3), 'WVB-S': (1, 3)}
+
+# Validation rules of the worksheets, as slices of the worksheet's kolomtags.
+# 'int' columns need an integer value, of which the 'nonneg' columns may not be
+# negative. 'str' columns need a string value, with 'land' a 'Land' column also
+# needs a two letter country code. Worksheets without rules are not validated.
+_RULES = {
+    ('AD-C', 'PD-C'): {'int': (slice(3, -1),), 'nonneg': (slice(4, 6), slice(7, 8)),
+                       'str': (slice(1, 3),), 'land': True},
+    ('AD-A', 'PD-A'): {'int': (slice(3, 4),),
+                       'str': (slice(1, 3), slice(-1, None)), 'land': True},
+    ('ADO-C',): {'int': (slice(2, None),), 'nonneg': (slice(2, 5), slice(-2, -1)),
+                 'str': (slice(1, 2),), 'land': True},
+    ('AEB-A', 'AEN-A'): {'int': (slice(4, 11), slice(-1, None)), 'nonneg': (slice(5, 7),),
+                         'str': (slice(2, 4),), 'land': True},
+    ('AEB-AI',): {'int': (slice(4, 7), slice(9, 11), slice(-1, None)), 'nonneg': (slice(5, 7),),
+                  'str': (slice(1, 2),)},
+    ('AEB-G', 'AEB-K', 'AEN-G', 'AEN-K'): {'int': (slice(4, -1),), 'nonneg': (slice(5, 7), slice(13, 15)),
+                                           'str': (slice(2, 4),), 'land': True},
+    ('AEB-KGI',): {'int': (slice(4, 7), slice(9, 11), slice(13, 15)), 'nonneg': (slice(5, 7), slice(13, 15)),
+                   'str': (slice(1, 2),)},
+    ('AEN-AI',): {'int': (slice(4, 7), slice(9, 11), slice(-1, None)), 'nonneg': (slice(5, 7),),
+                  'str': (slice(1, 3),), 'land': True},
+    ('AEN-KGI',): {'int': (slice(4, 7), slice(9, 11), slice(13, 15)), 'nonneg': (slice(5, 7), slice(13, 15)),
+                   'str': (slice(1, 3),), 'land': True},
+    ('ANF-C',): {'int': (slice(1, None),), 'nonneg': (slice(2, 4),)},
+    ('AO-FL', 'AO-HL', 'AO-LK', 'AO-LL', 'AO-RP'): {'int': (slice(3, 13), slice(-2, None)),
+                                                    'nonneg': (slice(3, 6), slice(9, 13), slice(-1, None)),
+                                                    'str': (slice(1, 3),), 'land': True},
+    ('AO-HY',): {'int': (slice(3, 13), slice(-2, None)), 'nonneg': (slice(3, 6), slice(9, 13), slice(-1, None)),
+                 'str': (slice(1, 2),), 'land': True},
+    ('AO-OK', 'AO-OL'): {'int': (slice(3, 10), slice(12, 13)), 'nonneg': (slice(3, 6), slice(9, 10), slice(12, 13)),
+                         'str': (slice(1, 3),), 'land': True},
+    ('AO-RC',): {'int': (slice(3, 10), slice(12, 14)), 'nonneg': (slice(4, 6), slice(12, 14)),
+                 'str': (slice(1, 3),), 'land': True},
+    ('D-FB',): {'int': (slice(5, 7),), 'nonneg': (slice(5, 7),),
+                'str': (slice(2, 3),), 'land': True},
+    ('D-OK', 'D-OS'): {'int': (slice(4, 7), slice(-2, None)), 'nonneg': (slice(4, 7), slice(-2, None)),
+                       'str': (slice(2, 4),), 'land': True},
+    ('D-OTR', 'D-OTV'): {'int': (slice(4, 8), slice(-3, None)), 'nonneg': (slice(4, 8), slice(-2, None)),
+                         'str': (slice(2, 4),), 'land': True},
+    ('GD-ECM', 'GD-ICM'): {'int': (slice(2, 4),), 'nonneg': (slice(2, 4),),
+                           'str': (slice(1, 2), slice(-1, None)), 'land': True},
+    ('PEN-A',): {'int': (slice(3, 10), slice(-1, None)), 'nonneg': (slice(4, 6), slice(9, 10), slice(-1, None)),
+                 'str': (slice(2, 3),), 'land': True},
+    ('PEN-AI',): {'int': (slice(3, 6), slice(8, 10), slice(-1, None)), 'nonneg': (slice(3, 6), slice(9, 10), slice(-1, None)),
+                  'str': (slice(1, 3),), 'land': True},
+    ('PEN-KGI',): {'int': (slice(3, 6), slice(8, 10), slice(13, 15)), 'nonneg': (slice(3, 6), slice(9, 10), slice(13, 15)),
+                   'str': (slice(1, 3),), 'land': True},
+    ('PEN-G', 'PEN-K'): {'int': (slice(3, -1),), 'nonneg': (slice(3, 6), slice(9, 14), slice(-2, -1)),
+                         'str': (slice(2, 3),), 'land': True},
+    ('PO-OK', 'PO-OL'): {'int': (slice(3, 10), slice(-3, -2)), 'nonneg': (slice(3, 6), slice(9, 10), slice(-3, -2)),
+                         'str': (slice(1, 3),), 'land': True},
+    ('PV-OV',): {'int': (slice(3, None),), 'nonneg': (slice(4, 6),)},
+    ('PO-FL', 'PO-HL', 'PO-LK', 'PO-LL', 'PO-RP'): {'int': (slice(3, 12), slice(-3, None)),
+                                                    'nonneg': (slice(3, 6), slice(9, 12), slice(-3, -2), slice(-1, None)),
+                                                    'str': (slice(1, 3),), 'land': True},
+    ('WVA-B',): {'int': (slice(2, 3),)},
+    ('WVB-B', 'WVB-L', 'WVB-S'): {'int': (slice(2, 3),), 'nonneg': (slice(2, 3),)},
+    ('WVU-B', 'WVU-L'): {'int': (slice(2, 3),), 'nonneg': (slice(2, 3),), 'str': (slice(1, 2),)},
+    ('WVA-R',): {'int': (slice(1, 2),)},
+}
+VALIDATION_RULES = {sheet: rules for sheets, rules in _RULES.items()
+                    for sheet in sheets}
+
+
+# exception and message for every kind of invalid cell _invalid_cells reports
+_MESSAGES = (
+    (EmptyValueError, 'Column "{k}" value of worksheet "{sheet}" cannot be empty'),
+    (IntegerValueError, 'Integer value is required in Column "{k}" of worksheet "{sheet}"'),
+    (AssertionError, 'Non-negative value required at ({k!r}, {sheet!r})'),
+    (StringValueError, 'String value is required in Column "{k}" of worksheet "{sheet}"'),
+    (LengthValueRequiredError, 'Example of accept values required column "Land" are "BE, NL, AZ" etc.'),
+)
+
+
+def _invalid_cells(sheet, df, columns):
+    """Find the cells of a worksheet that break its validation rules.
+
+    Parameters
+    ----------
+    sheet : str
+        Name of the worksheet, used to look up its VALIDATION_RULES.
+
+    df : pandas.DataFrame
+        The cleaned worksheet, with the kolomtags as columns.
+
+    columns : list
+        The kolomtags of the worksheet, which the rules slice.
+
+    Returns
+    -------
+    list
+        One exception for every kolomtag and kind of error found, in the
+        order the first such cell appears in the worksheet, row by row.
+        Empty if all cells are valid.
+    """
+    rules = VALIDATION_RULES.get(sheet)
+    if rules is None or df.empty:
+        return []
+
+    def tags(role):
+        return frozenset(tag for part in rules.get(role, ()) for tag in columns[part])
+
+    int_tags, nonneg_tags, str_tags = tags('int'), tags('nonneg'), tags('str')
+    stripped = [str(k).strip() for k in df.columns]
+    is_int_column = np.array([k in int_tags for k in stripped])
+    is_str_column = np.array([k not in int_tags and k in str_tags for k in stripped])
+    is_nonneg_column = np.array([k in nonneg_tags for k in df.columns])
+    is_land_column = np.array([rules.get('land', False) and k == 'Land' for k in stripped])
+
+    # columns with an integer dtype hold integers only, their cells need no type check
+    integer_dtype = np.array([pd.api.types.is_integer_dtype(dtype) for dtype in df.dtypes])
+    per_cell = (is_int_column | is_str_column) & ~integer_dtype
+
+    # one mask per check over all cells, the columns of df are the kolomtags
+    values = df.to_numpy(dtype=object)
+    empty = np.zeros(values.shape, dtype=bool)
+    is_int = np.zeros(values.shape, dtype=bool)
+    is_str = np.zeros(values.shape, dtype=bool)
+    negative = np.zeros(values.shape, dtype=bool)
+    wrong_length = np.zeros(values.shape, dtype=bool)
+
+    is_int[:, integer_dtype] = True
+    negative[:, integer_dtype] = df.loc[:, integer_dtype].to_numpy() < 0
+
+    cells = values[:, per_cell]
+    types = np.frompyfunc(type, 1, 1)(cells)
+    empty[:, per_cell] = cells == ''
+    is_int[:, per_cell] = types == int
+    is_str[:, per_cell] = types == str
+    negative[:, per_cell] = np.where(is_int[:, per_cell], cells, 0) < 0
+    # only the Land cells have a required length
+    land_cells = is_str & is_land_column
+    wrong_length[land_cells] = np.char.str_len(values[land_cells].astype(str)) != 2
+
+    invalid = (is_int_column & (empty | ~is_int | (is_nonneg_column & negative))
+               | is_str_column & (empty | ~is_str | (is_land_column & wrong_length)))
+
+    # the kind of error of every invalid cell, an empty cell is reported before anything else
+    kind = np.select([empty, is_int_column & ~is_int, is_int_column, ~is_str],
+                     [0, 1, 2, 3], default=4)
+
+    # row major order is the order in which the cells appear in the worksheet,
+    # only the first cell of every column and kind of error is reported
+    invalid_cells = np.flatnonzero(invalid)
+    column_kinds = invalid_cells % values.shape[1] * len(_MESSAGES) + kind.flat[invalid_cells]
+    _, first = np.unique(column_kinds, return_index=True)
+
+    errors = []
+    for cell in invalid_cells[np.sort(first)]:
+        k = df.columns[cell % values.shape[1]]
+        error, message = _MESSAGES[kind.flat[cell]]
+        errors.append(error(message.format(k=k, sheet=sheet)))
+    return errors
+
+
+@contextmanager
+def _xml_writer(path):
+    """Open an incremental xml writer on path.
+
+    The file is removed again if writing fails halfway, so no truncated
+    report is left behind for validation.
+    """
+    try:
+        # a 1 MiB buffer turns the many small writes into few large ones
+        with open(path, 'wb', buffering=1 << 20) as output, \
+                LT.xmlfile(output, encoding='UTF-8') as xf:
+            xf.write_declaration()
+            yield xf
+    except Exception:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+
+
+def _write(xf, tag, text):
+    """Write a single element with the given text to the xml writer."""
+    element = LT.Element(tag)
+    element.text = text
+    xf.write(element)
+
+
+def _sub(parent, tag, text):
+    """Append a child element with the given text to parent."""
+    element = LT.SubElement(parent, tag)
+    element.text = text
+    return element
+
+
+def _process_sheet(file, sheet):
+    """Parse and clean a single worksheet of an OFK workbook.
+
+    Runs in a worker process of generateXML.
+
+    Returns
+    -------
+    tuple
+        The form tag, the worksheet name, the cleaned worksheet and its kolomtags.
+    """
+    # Get each subform profile and process data information.
+    with pd.ExcelFile(file, engine=EXCEL_ENGINE) as workbook:
+        df = workbook.parse(sheet)
+
+    formName = df.iat[0, 0]  # get form tag from current worksheet
+
+    df.index = df.index.fillna('No label')  # set null indexes as 'no label'
+
+    # select column values with index name kolomtag
+    cols = df.loc['Kolomtag'].to_numpy()
+
+    df.columns = cols
+
+    cols = cols[pd.notna(cols)].tolist()  # keep the columns that have a kolomtag
+
+    df = df[cols]
+
+    if sheet in ['AD-A', 'PD-A']:
+
+        # drop indexes of dataframe
+        df.drop(index=['No label', 'Kolomtag'], inplace=True)
+
+        df.columns = cols  # replace header of dataframe with kolomtag column values
+
+    else:
+        # drop indexes and first column of dataframe
+        df.drop(index=['No label', 'Kolomtag'],
+                columns=[cols[0]], inplace=True)
+
+        df.reset_index(inplace=True)  # reset index of dataframe
+
+        df.columns = cols  # replace header of dataframe with kolomtag column values
+
+    # drop the columns DNB has explicitly blocked for values to be populated,
+    # before any further work is spent on them
+    columns_to_drop = DROP_COLUMNS.get(sheet)
+    if columns_to_drop:
+        df.drop(df.columns[list(columns_to_drop)],
+                axis=1, inplace=True)
+
+    # replace all null fields with empty string
+    df = df.fillna('')
+
+    return formName, sheet, df, cols
+
+
+def _stat(path):
+    """Return the modification time and size of path, which change when the file is saved."""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+@lru_cache(maxsize=16)
+def _worksheets(file, mtime, size):
+    """Parse and clean all worksheets of an OFK workbook.
+
+    The worksheets are parsed in worker processes, the result is cached in the
+    process that calls generateXML so later runs on the same workbook skip
+    parsing it. mtime and size are only part of the cache key so a saved
+    workbook is parsed again. The cached dataframes are shared between runs
+    and must not be modified.
+
+    Returns
+    -------
+    tuple
+        The result of _process_sheet for every worksheet, in workbook order.
+    """
+    with pd.ExcelFile(file, engine=EXCEL_ENGINE) as test:  # open Excelfile
+        # Select all but the Formulierenoverzicht worksheet.
+        sheets = [sheet for sheet in test.sheet_names
+                  if sheet != 'Formulierenoverzicht']
+
+    # worksheets are independent, parse and clean them in parallel. Pending log
+    # records are flushed first so forked workers do not inherit and write them again.
+    memory_handler.flush()
+    with ProcessPoolExecutor() as executor:
+        return tuple(executor.map(partial(_process_sheet, file), sheets))
+
+
+def _generate_one(file, generated_file_date):
+    """Convert a single OFK workbook to an xml report for generated_file_date next to it."""
+    logger.debug('Generating xml for --> %s\n', file)
+
+    # XML Header Information
+    xsi_value = OFK_NAMESPACE + ' ' + 'OFK-K.' + generated_file_date + '.xsd'
+    rootAttributes = {'{%s}schemaLocation' % XSI_NAMESPACE: xsi_value}
+
+    output = os.path.splitext(file)[0]
+    # form tag, worksheet name, cleaned worksheet and kolomtags of every worksheet
+    worksheets = _worksheets(file, *_stat(file))
+
+    # all worksheets are checked before anything is written, so every problem
+    # in the workbook is reported in one run
+    errors = [error for formName, sheet, df, cols in worksheets
+              for error in _invalid_cells(sheet, df, cols)]
+    if errors:
+        logger.error('Error Ocurred in %s!!!', file)
+        for error in errors:
+            logger.error(error)
+    else:
+        # the worksheets of every form tag, the forms in the order they first come up
+        forms = {}
+        for formName, sheet, df, cols in worksheets:
+            forms.setdefault(formName, []).append((sheet, df))
+
+        # elements are streamed to disk as soon as they are complete. Only the root
+        # is namespaced, the other tags are written in its default namespace.
+        with _xml_writer(output + '.xml') as xf, \
+                xf.element('{%s}OFK-K' % OFK_NAMESPACE, rootAttributes,
+                           nsmap={None: OFK_NAMESPACE, 'xsi': XSI_NAMESPACE}):
+            _write(xf, 'rappOpmerkingen', 'OFK ' + generated_file_date)
+
+            for formName, subforms in forms.items():
+                # lxml rejects the stray spaces some template tags have
+                with xf.element(formName.strip()):
+                    for sheet, df in subforms:
+                        kolomtags = [k.strip() for k in df.columns]
+                        control_tag = SUBFORM_REGELTAG[sheet]
+                        # the texts are made per column, the str of an integer needs no strip
+                        texts = [column.astype(str).tolist() if pd.api.types.is_integer_dtype(column)
+                                 else [str(v).strip() for v in column] for _, column in df.items()]
+                        with xf.element(sheet):
+                            for row in zip(*texts):
+                                element = LT.Element(control_tag)
+                                for k, text in zip(kolomtags, row):
+                                    _sub(element, k, text)
+                                xf.write(element)
+
+        logger.debug('Done generating xml for %s\n', file)
+
+
 def generateXML(files):
     """Gets and generate the xml file.
 
@@ -89,17 +500,11 @@ def generateXML(files):
     counter : int
         Used the keep track of the location of the spreadsheet.
 
-    existing_subForms : list, empty
-        Used to keep track of all OFK form tags which are in spreadsheet.
-
-    dataframes : list, empty
-        Used as a container to store form tag, subform and the dataframe.
-
-    generated_file_date : datetime
-        Used to keep track of the datetime when the form is generated.
+    forms : dict, empty
+        Used to group the worksheets under the OFK form tags which are in spreadsheet.
 
-    subformRegeltag : dict
-        Used as a container to store subform and their corresponding control tag.
+    generated_file_date : str
+        The year and month the report covers, the month before today.
 
     formName : str
         Used to keep track of the form tag of the current worksheet
@@ -110,9 +515,6 @@ def generateXML(files):
     output : str
         Output name of the file.
 
-    columns_to_validate : dict, empty
-        Used to track all column tags for which values are required. Used in the Error handling.
-
     Raises
     -------
     EmptyValueError
@@ -128,695 +530,80 @@ def generateXML(files):
         if non-negative value is provided
 
     """
-    subformRegeltag = {'AD-A': 'AlgDeeln', 'AD-C': 'DeelnAct', 'ADO-C': 'OnrGoed', 'AEB-A': 'Aandelen',
-                       'AEB-AI': 'Aandelen', 'AEBB-A': 'Aandelen', 'AEBB-AI': 'Aandelen', 'AEBB-G': 'GeldmarktPap',
-                       'AEBB-K': 'KapitaalmarktPap', 'AEBB-KGI': 'Schuldpapier', 'AEB-G': 'GeldmarktPap', 'AEB-K': 'KapitaalmarktPap',
-                       'AEB-KGI': 'Schuldpapier', 'AEI-A': 'Aandelen', 'AEI-AI': 'Aandelen', 'AEI-G': 'GeldmarktPap', 'AEI-K': 'KapitaalmarktPap',
-                       'AEI-KGI': 'Schuldpapier', 'AEL-A': 'Aandelen', 'AEL-AI': 'Aandelen', 'AEL-G': 'GeldmarktPap', 'AEL-K': 'KapitaalmarktPap',
-                       'AEL-KGI': 'Schuldpapier', 'AEN-A': 'Aandelen', 'AEN-AI': 'Aandelen', 'AENB-A': 'Aandelen', 'AENB-AI': 'Aandelen',
-                       'AENB-G': 'GeldmarktPap', 'AENB-K': 'KapitaalmarktPap', 'AENB-KGI': 'Schuldpapier', 'AENL-A': 'Aandelen',
-                       'AENL-AI': 'Aandelen', 'AENL-G': 'GeldmarktPap', 'AENL-K': 'KapitaalmarktPap', 'AENL-KGI': 'Schuldpapier',
-                       'AEN-G': 'GeldmarktPap', 'AEN-K': 'KapitaalmarktPap', 'AEN-KGI': 'Schuldpapier', 'AEU-A': 'Aandelen',
-                       'AEU-AI': 'Aandelen', 'AEU-G': 'GeldmarktPap', 'AEU-K': 'KapitaalmarktPap', 'AEU-KGI': 'Schuldpapier',
-                       'ANF-C': 'ActivaNietFin', 'ANF-CGM': 'ActivaNietFin', 'ANF-CGJ': 'ActivaNietFin', 'AO-DI': 'DeelnIntInst',
-                       'AOE-A': 'Aandelen', 'AOE-AI': 'Aandelen', 'AOE-G': 'GeldmarktPap', 'AOE-K': 'KapitaalmarktPap',
-                       'AOE-KGI': 'Schuldpapier', 'AO-FL': 'LeasesUG', 'AO-HK': 'HandUGK', 'AO-HL': 'HandUGL',
-                       'AO-HY': 'HypoUG', 'AO-LK': 'LeningUGK', 'AO-LL': 'LeningUGL', 'AO-OK': 'OverigeUGK',
-                       'AO-OL': 'OverigeUGL', 'AO-RC': 'RecCourant', 'AO-RP': 'RepoUG', 'AR': 'StichKap', 'AV-LP': 'TechVoorz',
-                       'AV-VV': 'LopenAanspr', 'BENB-A': 'Aandelen', 'BENB-AI': 'Aandelen', 'BENB-G': 'GeldmarktPap',
-                       'BENB-K': 'KapitaalmarktPap', 'BENB-KGI': 'Schuldpapier', 'BT': 'BalansTotaal', 'D-FB': 'Futures',
-                       'D-FN': 'Futures', 'DO-FB': 'Futures', 'D-OK': 'OptiesGekocht', 'DO-OK': 'OptiesGekocht', 'DO-OS': 'OptiesGeschr',
-                       'DO-OTR': 'OTCDerivaten', 'DO-OTV': 'OTVDerivaten', 'D-OS': 'OptiesGeschr', 'D-OTR': 'OTCDerivaten', 'D-OTV': 'OTVDerivaten',
-                       'IO-GO': 'OntwHulpGebond', 'IO-OO': 'OntwHulpSchenk', 'IO-XH': 'InkomOverdracht', 'GD-ECM': 'DienstExtraConcern',
-                       'GD-ICM': 'DienstIntraConcern', 'GD-GLM': 'RandLGebruiksLicent', 'GD-RLM': 'RandLReprodLicent', 'GD-ECJ': 'DienstExtraConcern',
-                       'GD-ICJ': 'DienstIntraConcern', 'GD-GLJ': 'RandLGebruiksLicent', 'GD-RLJ': 'RandLReprodLicent', 'IWB': 'IntrWaarde',
-                       'KO-KW': 'SchuldKwijtSch', 'KO-OG': 'OnrGoedBtlOv', 'KO-SR': 'Stamrechten', 'KO-VO': 'OverKapitOverdr',
-                       'PD-A': 'AlgDeeln', 'PD-C': 'DeelnPass', 'PEN-A': 'Aandelen', 'PEN-AI': 'Aandelen', 'PENB-A': 'Aandelen',
-                       'PENB-AI': 'Aandelen', 'PENB-G': 'GeldmarktPap', 'PENB-K': 'KapitaalmarktPap', 'PENB-KGI': 'Schuldpapier',
-                       'PENL-A': 'Aandelen', 'PENL-AI': 'Aandelen', 'PENL-G': 'GeldmarktPap', 'PENL-K': 'KapitaalmarktPap',
-                       'PENL-KGI': 'Schuldpapier', 'PEN-G': 'GeldmarktPap', 'PEN-K': 'KapitaalmarktPap', 'PEN-KGI': 'Schuldpapier',
-                       'PN-OS': 'NedTegenpartij', 'PO-FL': 'LeasesOG', 'PO-HK': 'HandOGK', 'PO-HL': 'HandOGL', 'PO-LK': 'LeningOGK',
-                       'PO-LL': 'LeningOGL', 'PO-OK': 'OverigeOGK', 'PO-OL': 'OverigeOGL', 'PO-RP': 'RepoOG', 'PV-LP': 'TechVoorz',
-                       'PV-OV': 'OverVoorz', 'PV-VV': 'LopenAanspr', 'SB-K': 'ParticipatieUGK', 'SB-L': 'ParticipatieUGL',
-                       'SN-K': 'ParticipatieOGK', 'SN-L': 'ParticipatieOGL', 'WE-A': 'Aandelen', 'WE-AI': 'Aandelen', 'WE-G': 'GeldmarktPap',
-                       'WE-K': 'KapitaalmarktPap', 'WE-KGI': 'Schuldpapier', 'WI-A': 'Aandelen', 'WI-AI': 'Aandelen', 'WI-G': 'GeldmarktPap',
-                       'WI-K': 'KapitaalmarktPap', 'WI-KGI': 'Schuldpapier', 'WVA-B': 'Bestemming', 'WVA-R': 'Resulaten', 'WVA-Z': 'Resulaten',
-                       'WVB-B': 'Baten', 'WVB-L': 'Bedrijfskosten', 'WVB-O': 'Bedrijfskosten', 'WVB-S': 'Loonkosten', 'WVP': 'WinstVerlPremUitk',
-                       'WVP-ZA': 'AanvZorg', 'WVP-ZZ': 'ZorgZvw', 'WVT-BL': 'TotBatenLasten', 'WVU-B': 'WinstVerlBuiten', 'WVU-L': 'LatenUitz'}
-
+    # the report covers the previous month, eg. 2020-04
+    today = date.today()
+    if today.month == 1:
+        generated_file_date = f'{today.year - 1}-12'
+    else:
+        generated_file_date = f'{today.year}-{today.month - 1:02d}'
+
+    # the worksheets of every workbook are parsed in parallel, the workbooks one
+    # after the other so their parsed worksheets are cached in this process
     for file in files:
-        logger.debug(f'Generating xml for --> {file}\n')
-        dataframes, existing_subForms = [], []
-        columns_to_validate = {}
-
-        # XML Header Information
-        generated_file_date = datetime.today().strftime('%Y-') + '0' + \
-            str(int(datetime.today().strftime('%m')) -
-                1)  # change 2 to 1 and put a condition here
-        root = ET.Element('OFK-K')
-        root.set("xmlns", "bb.dnb.nl")
-        root.set("xmlns:xsi", "http://www.w3.org/2001/XMLSchema-instance")
-        xsi_value = "bb.dnb.nl " + 'OFK-K.' + generated_file_date + '.xsd'
-        root.set('xsi:schemaLocation', xsi_value)
-
-        # XML Data information
-        generated_file_date = datetime.today().strftime('%Y-') + '0' + \
-            str(int(datetime.today().strftime('%m')) -
-                1)  # generate datetime information eg.2020-04
-        rappOpmerkingen = ET.SubElement(root, 'rappOpmerkingen')
-        rappOpmerkingen.text = 'OFK ' + generated_file_date
-
-        output = os.path.splitext(file)[0]
-        test = pd.ExcelFile(file)  # open Excelfile
-        for sheet in test.sheet_names:  # Loop through all sheets names
-            # Select Formulierenoverzicht worksheet.
-            if sheet == 'Formulierenoverzicht':
-                continue
-            else:
-                # Get each subform profile and process data information.
-                df = test.parse(sheet)
-
-                formName = df.reset_index(drop=True).iloc[0].values.tolist()[
-                    0]  # get form tag from current worksheet
-
-                df.index = pd.Series(df.index).replace(
-                    np.nan, 'No label')  # set null indexes as 'no label'
-
-                # select column values with index name kolomtag
-                cols = df.loc['Kolomtag'].tolist()
-
-                df.columns = cols
-
-                cols = [x for x in cols if str(x) != 'nan']
-
-                df = df[cols]
-
-                if sheet in ['AD-A', 'PD-A']:
-
-                    # drop indexes of dataframe
-                    df.drop(index=['No label', 'Kolomtag'], inplace=True)
-
-                    df.columns = cols  # replace header of dataframe with kolomtag column values
-
-                else:
-                    # drop indexes and first column of dataframe
-                    df.drop(index=['No label', 'Kolomtag'],
-                            columns=[cols[0]], inplace=True)
-
-                    df.reset_index(inplace=True)  # reset index of dataframe
-
-                    df.columns = cols  # replace header of dataframe with kolomtag column values
-
-                # replace all null fields with empty string
-                df = df.replace(np.nan, '', regex=True)
-
-                if sheet not in columns_to_validate:  # dict with sheet as key and column headers as values
-
-                    columns_to_validate[sheet] = cols
-
-                # the code below drops columns automatically for all worksheet which DNB has explicitly blocked for no values to be populated.
-                if sheet in ['AD-C', 'PD-C']:
-                    df.drop(df.columns[-1], axis=1, inplace=True)
-                elif sheet in ['AEB-A', 'AEN-A']:
-                    df.drop(
-                        df.columns[[1, 11, 12, 13, 14, 15, 16]], axis=1, inplace=True)
-                elif sheet == 'AEB-AI':
-                    df.drop(
-                        df.columns[[2, 3, 7, 8, 11, 12, 13, 14, 15, 16]], axis=1, inplace=True)
-                elif sheet in ['AEB-G', "AEB-K", 'AEN-G', 'AEN-K']:
-                    df.drop(df.columns[[1, 17]], axis=1, inplace=True)
-                elif sheet == 'AEB-KGI':
-                    df.drop(
-                        df.columns[[2, 3, 7, 8, 11, 12, 15, 16, 17]], axis=1, inplace=True)
-                elif sheet == 'AEN-AI':
-                    df.drop(df.columns[[3, 7, 8, 11, 12, 13,
-                                        14, 15, 16]], axis=1, inplace=True)
-                elif sheet == 'AEN-KGI':
-                    df.drop(
-                        df.columns[[3, 7, 8, 11, 12, 15, 16, 17]], axis=1, inplace=True)
-                elif sheet in ['AO-FL', 'AO-HL', 'AO-LK', 'AO-LL', 'AO-RP']:
-                    df.drop(df.columns[[13]], axis=1, inplace=True)
-                elif sheet == 'AO-HY':
-                    df.drop(df.columns[[2, 13]], axis=1, inplace=True)
-                elif sheet in ['AO-OK', 'AO-OL']:
-                    df.drop(df.columns[[10, 11, 13, 14, 15]],
-                            axis=1, inplace=True)
-                elif sheet == 'AO-RC':
-                    df.drop(df.columns[[10, 11, 14, 15]], axis=1, inplace=True)
-                elif sheet == 'D-FB':
-                    df.drop(df.columns[[1, 3, 4, 7, 8, 9, 10]],
-                            axis=1, inplace=True)
-                elif sheet in ['D-OK', 'D-OS']:
-                    df.drop(df.columns[[1, 7, 8]], axis=1, inplace=True)
-                elif sheet in ['D-OTR', 'D-OTV']:
-                    df.drop(df.columns[[1, 8, 9]], axis=1, inplace=True)
-                elif sheet == 'PEN-A':
-                    df.drop(
-                        df.columns[[1, 10, 11, 12, 13, 14, 15]], axis=1, inplace=True)
-                elif sheet == 'PEN-AI':
-                    df.drop(
-                        df.columns[[6, 7, 10, 11, 12, 13, 14, 15]], axis=1, inplace=True)
-                elif sheet == 'PEN-KGI':
-                    df.drop(
-                        df.columns[[6, 7, 10, 11, 14, 15, 16]], axis=1, inplace=True)
-                elif sheet in ['PEN-G', 'PEN-K']:
-                    df.drop(df.columns[[1, 16]], axis=1, inplace=True)
-                elif sheet in ['PO-OK', 'PO-OL']:
-                    df.drop(df.columns[[10, 11, 12, 14, 15]],
-                            axis=1, inplace=True)
-                elif sheet == 'PV-OV':
-                    df.drop(df.columns[[1, 2]], axis=1, inplace=True)
-                elif sheet in ['PO-FL', 'PO-HL', 'PO-LK', 'PO-LL', 'PO-RP']:
-                    df.drop(df.columns[[12]], axis=1, inplace=True)
-                elif sheet == 'WVA-B':
-                    df.drop(df.columns[[1]], axis=1, inplace=True)
-                elif sheet in ['WVB-B', 'WVB-L', 'WVB-S']:
-                    df.drop(df.columns[[1, 3]], axis=1, inplace=True)
-
-                if sheet == 'AO-RC':
-                    print(df.head())
-
-                df = df.T  # transpose dataframe
-                # append form, worksheet and transposed dataframe.
-                dataframes.append((formName, sheet, df))
-
-        # Loop through list and verify fields within the worksheet before creating the xml fields below.
-        try:
-            for data in dataframes:  # loop through list
-                # loop through transposed dataframe (dict)
-                for key, values in data[2].items():
-                    for k, v in values.items():
-                        # check condition to see if sheet is in the range, if yes, verify if all field values are satisfied
-                        if data[1] in ['AD-C', 'PD-C']:
-                            if k.strip() in columns_to_validate[data[1]][3:-1]:
-                                if v == '':
-                                    raise EmptyValueError
-                                if type(v) != int:
-                                    raise IntegerValueError
-                                if k in columns_to_validate[data[1]][4:6] + columns_to_validate[data[1]][7:8]:
-                                    assert(
-                                        int(v) >= 0), f"Non-negative value required at {k,data[1]}"
-                            elif k.strip() in columns_to_validate[data[1]][1:3]:
-                                if v == '':
-                                    raise EmptyValueError
-                                if type(v) != str:
-                                    raise StringValueError
-                                if k.strip() == 'Land' and len(v) != 2:
-                                    raise LengthValueRequiredError
-
-                        elif data[1] in ['AD-A', 'PD-A']:
-                            if k.strip() in columns_to_validate[data[1]][3:4]:
-                                if v == '':
-                                    raise EmptyValueError
-                                if type(v) != int:
-                                    raise IntegerValueError
-                            elif k.strip() in columns_to_validate[data[1]][1:3] + columns_to_validate[data[1]][-1:]:
-                                if v == '':
-                                    raise EmptyValueError
-                                if type(v) != str:
-                                    raise StringValueError
-                                if k.strip() == 'Land' and len(v) != 2:
-                                    raise LengthValueRequiredError
-
-                        elif data[1] == 'ADO-C':
-                            if k.strip() in columns_to_validate[data[1]][2:]:
-                                if v == '':
-                                    raise EmptyValueError
-                                if type(v) != int:
-                                    raise IntegerValueError
-                                if k in columns_to_validate[data[1]][2:5] + columns_to_validate[data[1]][-2:-1]:
-                                    assert(
-                                        int(v) >= 0), f"Non-negative value required at {k,data[1]}"
-                            elif k.strip() == columns_to_validate[data[1]][1]:
-                                if v == '':
-                                    raise EmptyValueError
-                                if type(v) != str:
-                                    raise StringValueError
-                                if k.strip() == 'Land' and len(v) != 2:
-                                    raise LengthValueRequiredError
-
-                        elif data[1] in ['AEB-A', 'AEN-A']:
-                            if k.strip() in columns_to_validate[data[1]][4:11] + columns_to_validate[data[1]][-1:]:
-                                if v == '':
-                                    raise EmptyValueError
-                                if type(v) != int:
-                                    raise IntegerValueError
-                                if k in columns_to_validate[data[1]][5:7]:
-                                    assert(
-                                        int(v) >= 0), f"Non-negative value required at {k,data[1]}"
-                            elif k.strip() in columns_to_validate[data[1]][2:4]:
-                                if v == '':
-                                    raise EmptyValueError
-                                if type(v) != str:
-                                    raise StringValueError
-                                if k.strip() == 'Land' and len(v) != 2:
-                                    raise LengthValueRequiredError
-
-                        elif data[1] == 'AEB-AI':
-                            if k.strip() in columns_to_validate[data[1]][4:7] + columns_to_validate[data[1]][9:11] + columns_to_validate[data[1]][-1:]:
-                                if v == '':
-                                    raise EmptyValueError
-                                if type(v) != int:
-                                    raise IntegerValueError
-                                if k in columns_to_validate[data[1]][5:7]:
-                                    assert(
-                                        int(v) >= 0), f"Non-negative value required at {k,data[1]}"
-                            elif k.strip() == columns_to_validate[data[1]][1]:
-                                if v == '':
-                                    raise EmptyValueError
-                                if type(v) != str:
-                                    raise StringValueError
-
-                        elif data[1] in ['AEB-G', "AEB-K", 'AEN-G', 'AEN-K']:
-                            if k.strip() in columns_to_validate[data[1]][4:-1]:
-                                if v == '':
-                                    raise EmptyValueError
-                                if type(v) != int:
-                                    raise IntegerValueError
-                                if k in columns_to_validate[data[1]][5:7] + columns_to_validate[data[1]][13:15]:
-                                    assert(
-                                        int(v) >= 0), f"Non-negative value required at {k,data[1]}"
-                            elif k.strip() in columns_to_validate[data[1]][2:4]:
-                                if v == '':
-                                    raise EmptyValueError
-                                if type(v) != str:
-                                    raise StringValueError
-                                if k.strip() == 'Land' and len(v) != 2:
-                                    raise LengthValueRequiredError
-
-                        elif data[1] == 'AEB-KGI':
-                            if k.strip() in columns_to_validate[data[1]][4:7] + columns_to_validate[data[1]][9:11] + columns_to_validate[data[1]][13:15]:
-                                if v == '':
-                                    raise EmptyValueError
-                                if type(v) != int:
-                                    raise IntegerValueError
-                                if k in columns_to_validate[data[1]][5:7] + columns_to_validate[data[1]][13:15]:
-                                    assert(
-                                        int(v) >= 0), f"Non-negative value required at {k,data[1]}"
-                            elif k.strip() == columns_to_validate[data[1]][1]:
-                                if v == '':
-                                    raise EmptyValueError
-                                if type(v) != str:
-                                    raise StringValueError
-
-                        elif data[1] == 'AEN-AI':
-                            if k.strip() in columns_to_validate[data[1]][4:7] + columns_to_validate[data[1]][9:11] + columns_to_validate[data[1]][-1:]:
-                                if v == '':
-                                    raise EmptyValueError
-                                if type(v) != int:
-                                    raise IntegerValueError
-                                if k in columns_to_validate[data[1]][5:7]:
-                                    assert(
-                                        int(v) >= 0), f"Non-negative value required at {k,data[1]}"
-                            elif k.strip() in columns_to_validate[data[1]][1:3]:
-                                if v == '':
-                                    raise EmptyValueError
-                                if type(v) != str:
-                                    raise StringValueError
-                                if k.strip() == 'Land' and len(v) != 2:
-                                    raise LengthValueRequiredError
-#
-                        elif data[1] == 'AEN-KGI':
-                            if k.strip() in columns_to_validate[data[1]][4:7] + columns_to_validate[data[1]][9:11] + columns_to_validate[data[1]][13:15]:
-                                if v == '':
-                                    raise EmptyValueError
-                                if type(v) != int:
-                                    raise IntegerValueError
-                                if k in columns_to_validate[data[1]][5:7] + columns_to_validate[data[1]][13:15]:
-                                    assert(
-                                        int(v) >= 0), f"Non-negative value required at {k,data[1]}"
-                            elif k.strip() in columns_to_validate[data[1]][1:3]:
-                                if v == '':
-                                    raise EmptyValueError
-                                if type(v) != str:
-                                    raise StringValueError
-                                if k.strip() == 'Land' and len(v) != 2:
-                                    raise LengthValueRequiredError
-
-                        elif data[1] == 'ANF-C':
-                            if k.strip() in columns_to_validate[data[1]][1:]:
-                                if v == '':
-                                    raise EmptyValueError
-                                if type(v) != int:
-                                    raise IntegerValueError
-                                if k in columns_to_validate[data[1]][2:4]:
-                                    assert(
-                                        int(v) >= 0), f"Non-negative value required at {k,data[1]}"
-
-                        elif data[1] in ['AO-FL', 'AO-HL', 'AO-LK', 'AO-LL', 'AO-RP']:
-                            if k.strip() in columns_to_validate[data[1]][3:13] + columns_to_validate[data[1]][-2:]:
-                                if v == '':
-                                    raise EmptyValueError
-                                if type(v) != int:
-                                    raise IntegerValueError
-                                if k in columns_to_validate[data[1]][3:6] + columns_to_validate[data[1]][9:13] + columns_to_validate[data[1]][-1:]:
-                                    assert(
-                                        int(v) >= 0), f"Non-negative value required at {k,data[1]}"
-                            elif k.strip() in columns_to_validate[data[1]][1:3]:
-                                if v == '':
-                                    raise EmptyValueError
-                                if type(v) != str:
-                                    raise StringValueError
-                                if k.strip() == 'Land' and len(v) != 2:
-                                    raise LengthValueRequiredError
-
-                        elif data[1] == 'AO-HY':
-                            if k.strip() in columns_to_validate[data[1]][3:13] + columns_to_validate[data[1]][-2:]:
-                                if v == '':
-                                    raise EmptyValueError
-                                if type(v) != int:
-                                    raise IntegerValueError
-                                if k in columns_to_validate[data[1]][3:6] + columns_to_validate[data[1]][9:13] + columns_to_validate[data[1]][-1:]:
-                                    assert(
-                                        int(v) >= 0), f"Non-negative value required at {k,data[1]}"
-                            elif k.strip() == columns_to_validate[data[1]][1]:
-                                if v == '':
-                                    raise EmptyValueError
-                                if type(v) != str:
-                                    raise StringValueError
-                                if k.strip() == 'Land' and len(v) != 2:
-                                    raise LengthValueRequiredError
-
-                        elif data[1] in ['AO-OK', 'AO-OL']:
-                            if k.strip() in columns_to_validate[data[1]][3:10] + columns_to_validate[data[1]][12:13]:
-                                if v == '':
-                                    raise EmptyValueError
-                                if type(v) != int:
-                                    raise IntegerValueError
-                                if k in columns_to_validate[data[1]][3:6] + columns_to_validate[data[1]][9:10] + columns_to_validate[data[1]][12:13]:
-                                    assert(
-                                        int(v) >= 0), f"Non-negative value required at {k,data[1]}"
-                            elif k.strip() in columns_to_validate[data[1]][1:3]:
-                                if v == '':
-                                    raise EmptyValueError
-                                if type(v) != str:
-                                    raise StringValueError
-                                if k.strip() == 'Land' and len(v) != 2:
-                                    raise LengthValueRequiredError
-
-                        elif data[1] == 'AO-RC':
-                            if k.strip() in columns_to_validate[data[1]][3:10] + columns_to_validate[data[1]][12:14]:
-                                if v == '':
-                                    raise EmptyValueError
-                                if type(v) != int:
-                                    raise IntegerValueError
-                                if k in columns_to_validate[data[1]][4:6] + columns_to_validate[data[1]][12:14]:
-                                    assert(
-                                        int(v) >= 0), f"Non-negative value required at {k,data[1]}"
-                            elif k.strip() in columns_to_validate[data[1]][1:3]:
-                                if v == '':
-                                    raise EmptyValueError
-                                if type(v) != str:
-                                    raise StringValueError
-                                if k.strip() == 'Land' and len(v) != 2:
-                                    raise LengthValueRequiredError
-
-                        elif data[1] == 'D-FB':
-                            if k.strip() in columns_to_validate[data[1]][5:7]:
-                                if v == '':
-                                    raise EmptyValueError
-                                if type(v) != int:
-                                    raise IntegerValueError
-                                if k in columns_to_validate[data[1]][5:7]:
-                                    assert(
-                                        int(v) >= 0), f"Non-negative value required at {k,data[1]}"
-                            elif k.strip() == columns_to_validate[data[1]][2]:
-                                if v == '':
-                                    raise EmptyValueError
-                                if type(v) != str:
-                                    raise StringValueError
-                                if k.strip() == 'Land' and len(v) != 2:
-                                    raise LengthValueRequiredError
-
-                        elif data[1] in ['D-OK', 'D-OS']:
-                            if k.strip() in columns_to_validate[data[1]][4:7] + columns_to_validate[data[1]][-2:]:
-                                if v == '':
-                                    raise EmptyValueError
-                                if type(v) != int:
-                                    raise IntegerValueError
-                                if k in columns_to_validate[data[1]][4:7] + columns_to_validate[data[1]][-2:]:
-                                    assert(
-                                        int(v) >= 0), f"Non-negative value required at {k,data[1]}"
-                            elif k.strip() in columns_to_validate[data[1]][2:4]:
-                                if v == '':
-                                    raise EmptyValueError
-                                if type(v) != str:
-                                    raise StringValueError
-                                if k.strip() == 'Land' and len(v) != 2:
-                                    raise LengthValueRequiredError
-
-                        elif data[1] in ['D-OTR', 'D-OTV']:
-                            if k.strip() in columns_to_validate[data[1]][4:8] + columns_to_validate[data[1]][-3:]:
-                                if v == '':
-                                    raise EmptyValueError
-                                if type(v) != int:
-                                    raise IntegerValueError
-                                if k in columns_to_validate[data[1]][4:8] + columns_to_validate[data[1]][-2:]:
-                                    assert(
-                                        int(v) >= 0), f"Non-negative value required at {k,data[1]}"
-                            elif k.strip() in columns_to_validate[data[1]][2:4]:
-                                if v == '':
-                                    raise EmptyValueError
-                                if type(v) != str:
-                                    raise StringValueError
-                                if k.strip() == 'Land' and len(v) != 2:
-                                    raise LengthValueRequiredError
-
-                        elif data[1] in ['GD-ECM', 'GD-ICM']:
-                            if k.strip() in columns_to_validate[data[1]][2:4]:
-                                if v == '':
-                                    raise EmptyValueError
-                                if type(v) != int:
-                                    raise IntegerValueError
-                                if k in columns_to_validate[data[1]][2:4]:
-                                    assert(
-                                        int(v) >= 0), f"Non-negative value required at {k,data[1]}"
-                            elif k.strip() in columns_to_validate[data[1]][1:2] + columns_to_validate[data[1]][-1:]:
-                                if v == '':
-                                    raise EmptyValueError
-                                if type(v) != str:
-                                    raise StringValueError
-                                if k.strip() == 'Land' and len(v) != 2:
-                                    raise LengthValueRequiredError
-
-                        elif data[1] == 'PEN-A':
-                            if k.strip() in columns_to_validate[data[1]][3:10] + columns_to_validate[data[1]][-1:]:
-                                if v == '':
-                                    raise EmptyValueError
-                                if type(v) != int:
-                                    raise IntegerValueError
-                                if k in columns_to_validate[data[1]][4:6] + columns_to_validate[data[1]][9:10] + columns_to_validate[data[1]][-1:]:
-                                    assert(
-                                        int(v) >= 0), f"Non-negative value required at {k,data[1]}"
-                            elif k.strip() == columns_to_validate[data[1]][2]:
-                                if v == '':
-                                    raise EmptyValueError
-                                if type(v) != str:
-                                    raise StringValueError
-                                if k.strip() == 'Land' and len(v) != 2:
-                                    raise LengthValueRequiredError
-
-                        elif data[1] == 'PEN-AI':
-                            if k.strip() in columns_to_validate[data[1]][3:6] + columns_to_validate[data[1]][8:10] + columns_to_validate[data[1]][-1:]:
-                                if v == '':
-                                    raise EmptyValueError
-                                if type(v) != int:
-                                    raise IntegerValueError
-                                if k in columns_to_validate[data[1]][3:6] + columns_to_validate[data[1]][9:10] + columns_to_validate[data[1]][-1:]:
-                                    assert(
-                                        int(v) >= 0), f"Non-negative value required at {k,data[1]}"
-                            elif k.strip() in columns_to_validate[data[1]][1:3]:
-                                if v == '':
-                                    raise EmptyValueError
-                                if type(v) != str:
-                                    raise StringValueError
-                                if k.strip() == 'Land' and len(v) != 2:
-                                    raise LengthValueRequiredError
-
-                        elif data[1] == 'PEN-KGI':
-                            if k.strip() in columns_to_validate[data[1]][3:6] + columns_to_validate[data[1]][8:10] + columns_to_validate[data[1]][13:15]:
-                                if v == '':
-                                    raise EmptyValueError
-                                if type(v) != int:
-                                    raise IntegerValueError
-                                if k in columns_to_validate[data[1]][3:6] + columns_to_validate[data[1]][9:10] + columns_to_validate[data[1]][13:15]:
-                                    assert(
-                                        int(v) >= 0), f"Non-negative value required at {k,data[1]}"
-                            elif k.strip() in columns_to_validate[data[1]][1:3]:
-                                if v == '':
-                                    raise EmptyValueError
-                                if type(v) != str:
-                                    raise StringValueError
-                                if k.strip() == 'Land' and len(v) != 2:
-                                    raise LengthValueRequiredError
-
-                        elif data[1] in ['PEN-G', 'PEN-K']:
-                            if k.strip() in columns_to_validate[data[1]][3:-1]:
-                                if v == '':
-                                    raise EmptyValueError
-                                if type(v) != int:
-                                    raise IntegerValueError
-                                if k in columns_to_validate[data[1]][3:6] + columns_to_validate[data[1]][9:14] + columns_to_validate[data[1]][-2:-1]:
-                                    assert(
-                                        int(v) >= 0), f"Non-negative value required at {k,data[1]}"
-                            elif k.strip() == columns_to_validate[data[1]][2]:
-                                if v == '':
-                                    raise EmptyValueError
-                                if type(v) != str:
-                                    raise StringValueError
-                                if k.strip() == 'Land' and len(v) != 2:
-                                    raise LengthValueRequiredError
-
-                        elif data[1] in ['PO-OK', 'PO-OL']:
-                            if k.strip() in columns_to_validate[data[1]][3:10] + columns_to_validate[data[1]][-3:-2]:
-                                if v == '':
-                                    raise EmptyValueError
-                                if type(v) != int:
-                                    raise IntegerValueError
-                                if k in columns_to_validate[data[1]][3:6] + columns_to_validate[data[1]][9:10] + columns_to_validate[data[1]][-3:-2]:
-                                    assert(
-                                        int(v) >= 0), f"Non-negative value required at {k,data[1]}"
-                            elif k.strip() in columns_to_validate[data[1]][1:3]:
-                                if v == '':
-                                    raise EmptyValueError
-                                if type(v) != str:
-                                    raise StringValueError
-                                if k.strip() == 'Land' and len(v) != 2:
-                                    raise LengthValueRequiredError
-
-                        elif data[1] == 'PV-OV':
-                            if k.strip() in columns_to_validate[data[1]][3:]:
-                                if v == '':
-                                    raise EmptyValueError
-                                if type(v) != int:
-                                    raise IntegerValueError
-                                if k in columns_to_validate[data[1]][4:6]:
-                                    assert(
-                                        int(v) >= 0), f"Non-negative value required at {k,data[1]}"
-
-                        elif data[1] in ['PO-FL', 'PO-HL', 'PO-LK', 'PO-LL', 'PO-RP']:
-                            if k.strip() in columns_to_validate[data[1]][3:12] + columns_to_validate[data[1]][-3:]:
-                                if v == '':
-                                    raise EmptyValueError
-                                if type(v) != int:
-                                    raise IntegerValueError
-                                if k in columns_to_validate[data[1]][3:6] + columns_to_validate[data[1]][9:12] + columns_to_validate[data[1]][-3:-2] + columns_to_validate[data[1]][-1:]:
-                                    assert(
-                                        int(v) >= 0), f"Non-negative value required at {k,data[1]}"
-                            elif k.strip() in columns_to_validate[data[1]][1:3]:
-                                if v == '':
-                                    raise EmptyValueError
-                                if type(v) != str:
-                                    raise StringValueError
-                                if k.strip() == 'Land' and len(v) != 2:
-                                    raise LengthValueRequiredError
-
-                        elif data[1] == 'WVA-B':
-                            if k.strip() == columns_to_validate[data[1]][2]:
-                                if v == '':
-                                    raise EmptyValueError
-                                if type(v) != int:
-                                    raise IntegerValueError
-
-                        elif data[1] in ['WVB-B', 'WVB-L', 'WVB-S']:
-                            if k.strip() == columns_to_validate[data[1]][2]:
-                                if v == '':
-                                    raise EmptyValueError
-                                if type(v) != int:
-                                    raise IntegerValueError
-                                if k == columns_to_validate[data[1]][2]:
-                                    assert(
-                                        int(v) >= 0), f"Non-negative value required at {k,data[1]}"
-
-                        elif data[1] in ['WVU-B', 'WVU-L']:
-                            if k.strip() == columns_to_validate[data[1]][2]:
-                                if v == '':
-                                    raise EmptyValueError
-                                if type(v) != int:
-                                    raise IntegerValueError
-                                if k == columns_to_validate[data[1]][2]:
-                                    assert(
-                                        int(v) >= 0), f"Non-negative value required at {k,data[1]}"
-                            elif k.strip() == columns_to_validate[data[1]][1]:
-                                if v == '':
-                                    raise EmptyValueError
-                                if type(v) != str:
-                                    raise StringValueError
-
-                        elif data[1] == 'WVA-R':
-                            if k.strip() == columns_to_validate[data[1]][1]:
-                                if v == '':
-                                    raise EmptyValueError
-                                if type(v) != int:
-                                    raise IntegerValueError
-
-        except IntegerValueError:
-            logger.error(f'Error Ocurred in {file}!!!')
-            logger.error(
-                f'Integer value is required in Column "{k}" of worksheet "{data[1]}"')
-        except AssertionError as e:
-            logger.error('Error Ocurred in {file}!!!')
-            logger.error(e)
-        except EmptyValueError:
-            logger.error(f'Error Ocurred in {file}!!!')
-            logger.error(
-                f'Column "{k}" value of worksheet "{data[1]}" cannot be empty')
-        except StringValueError:
-            logger.error(f'Error Ocurred in {file}!!!')
-            logger.error(
-                f'String value is required in Column "{k}" of worksheet "{data[1]}"')
-        except LengthValueRequiredError:
-            logger.error('Error Ocurred in {file}!!!')
-            logger.error(
-                f'Example of accept values required column "Land" are "BE, NL, AZ" etc.')
-        else:
-            for data in dataframes:
-                if data[0] in existing_subForms:
-                    subformName = data[1]
-                    subformName = ET.SubElement(formName, subformName)
-                    for key, values in data[2].items():
-                        control_tag = subformRegeltag[data[1]]
-                        control_tag = ET.SubElement(subformName, control_tag)
-                        for k, v in values.items():
-                            k = ET.SubElement(control_tag, k)
-                            k.text = str(v).strip()
-                else:
-                    formName = data[0]
-                    formName = ET.SubElement(root, formName)
-                    subformName = data[1]
-                    subformName = ET.SubElement(formName, subformName)
-                    for key, values in data[2].items():
-                        control_tag = subformRegeltag[data[1]]
-                        control_tag = ET.SubElement(subformName, control_tag)
-                        for k, v in values.items():
-                            k = ET.SubElement(control_tag, k)
-                            k.text = str(v).strip()
-                    existing_subForms.append(data[0])
-
-            tree = ET.ElementTree(root)  # end of xml tree
-            tree.write(output + '.xml', encoding="UTF-8",
-                       xml_declaration=True)  # write xml to file
-            logger.debug(f'Done generating xml for {file}\n')
+        _generate_one(file, generated_file_date)
+
+
+@lru_cache(maxsize=4)
+def _xml_validator(xsd, mtime, size):
+    """Compile the schema xsd once, mtime and size only key the cache so an updated schema is compiled again."""
+    return LT.XMLSchema(file=xsd)
+
+
+def _is_valid(file, xml_validator):
+    """Parse file and validate it against the schema in the same pass."""
+    parser = LT.XMLParser(schema=xml_validator)
+    try:
+        LT.parse(file, parser)
+    except LT.XMLSyntaxError:
+        return False
+    return True
+
+
+def _validation_errors(file, xml_validator):
+    """Validate file once more to find out where it is invalid.
+
+    Returns
+    -------
+    list
+        A message with the line and column of every error, empty if file is valid.
+    """
+    try:
+        xml_validator.assertValid(LT.parse(file))
+    except LT.XMLSyntaxError as e:  # not even well-formed
+        return [e.msg]
+    except LT.DocumentInvalid as e:
+        return [f'line {error.line}, column {error.column}: {error.message}' for error in e.error_log]
+    return []
 
 
 def validate_XML_OFKFiles(files):
-    for file in files:
-        xml_file = LT.parse(file)
-        xml_validator = LT.XMLSchema(file="OFK-K.2020-03.xsd")
-        is_valid = xml_validator.validate(xml_file)
+    xsd = "OFK-K.2020-03.xsd"
+    xml_validator = _xml_validator(xsd, *_stat(xsd))
+    # lxml releases the GIL while parsing, so the reports are parsed in threads
+    with ThreadPoolExecutor() as executor:
+        valid = list(executor.map(_is_valid, files, repeat(xml_validator)))
+
+    # the validator keeps its error log on itself, the failures are explained
+    # one by one once the threads are done
+    for file, is_valid in zip(files, valid):
         if is_valid:
-            logger.debug(f'{file} has successfully been validated!')
+            logger.debug('%s has successfully been validated!', file)
         else:
-            logger.error(f'Validation for {file} was unsuccessful!')
+            logger.error('Validation for %s was unsuccessful!', file)
+            for error in _validation_errors(file, xml_validator):
+                logger.error('%s: %s', file, error)
+
+
+def _list_files(suffixes):
+    """Return the names of the files in the working directory ending with one of suffixes."""
+    with os.scandir('.') as entries:
+        return [entry.name for entry in entries if entry.name.endswith(suffixes)]
 
 
 if __name__ == '__main__':
     path = ''  # specify path or location to excel files
     os.chdir(path)
-    files = []
-    types = ('*.xls', '*.xlsx')
-    for ext in types:
-        files.extend(glob.glob(ext))
+    files = _list_files(('.xls', '.xlsx'))
     generateXML(files)
-    xmls = glob.glob("*.xml")
+    xmls = _list_files('.xml')
     validate_XML_OFKFiles(xmls)